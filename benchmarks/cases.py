@@ -0,0 +1,169 @@
+"""Benchmark cases covering vsfieldkit's public functions.
+
+Each case builds a graph from the synthetic sources. Cases needing optional
+plugins raise vapoursynth.Error while building if those are missing, and are
+reported as skipped.
+"""
+from typing import Callable, NamedTuple
+
+from sources import BenchmarkSources
+from vapoursynth import VideoNode
+
+import vsfieldkit
+from vsfieldkit.kernels import prepare_nnedi3_chroma_upsampler
+
+
+class BenchmarkCase(NamedTuple):
+    name: str
+    function: str
+    """Public vsfieldkit function exercised by the case."""
+    build: Callable[[BenchmarkSources], VideoNode]
+
+
+def _scan_interlaced_case(name, **kwargs) -> BenchmarkCase:
+    return BenchmarkCase(
+        name=name,
+        function='scan_interlaced',
+        build=lambda sources: vsfieldkit.scan_interlaced(
+            sources.interlaced,
+            **kwargs
+        )
+    )
+
+
+CASES = (
+    BenchmarkCase(
+        name='bob',
+        function='bob',
+        build=lambda sources: vsfieldkit.bob(sources.interlaced)
+    ),
+    BenchmarkCase(
+        name='bob_unshifted',
+        function='bob',
+        build=lambda sources: vsfieldkit.bob(sources.interlaced, shift=False)
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_latest',
+        chroma_subsample_scanning=vsfieldkit.SCAN_LATEST
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_blended',
+        chroma_subsample_scanning=vsfieldkit.SCAN_BLENDED
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_latest_subsampled',
+        chroma_subsample_scanning=vsfieldkit.SCAN_LATEST_SUBSAMPLED
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_upsampled',
+        chroma_subsample_scanning=vsfieldkit.SCAN_UPSAMPLED
+    ),
+    _scan_interlaced_case('scan_interlaced_decay', decay_factor=0.5),
+    _scan_interlaced_case('scan_interlaced_attack', attack_factor=1.2),
+    _scan_interlaced_case(
+        'scan_interlaced_attack_decay',
+        attack_factor=1.2,
+        decay_factor=0.5
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_fused',
+        engine=vsfieldkit.InterlacedScanEngine.FUSED
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_fused_attack_decay',
+        engine=vsfieldkit.InterlacedScanEngine.FUSED,
+        attack_factor=1.2,
+        decay_factor=0.5
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_blend_vertically',
+        post_processing=(vsfieldkit.BLEND_VERTICALLY,)
+    ),
+    _scan_interlaced_case(
+        'scan_interlaced_blend_vertically_convolved',
+        post_processing=(vsfieldkit.BLEND_VERTICALLY_CONVOLVED,)
+    ),
+    BenchmarkCase(
+        name='telecine_pattern',
+        function='telecine',
+        build=lambda sources: vsfieldkit.telecine(
+            sources.progressive,
+            tff=True,
+            pulldown_pattern=vsfieldkit.NTSC_FILM_PULLDOWN
+        )
+    ),
+    BenchmarkCase(
+        name='telecine_pattern_progressive_chroma',
+        function='telecine',
+        build=lambda sources: vsfieldkit.telecine(
+            sources.progressive,
+            tff=True,
+            pulldown_pattern=vsfieldkit.NTSC_FILM_PULLDOWN,
+            interlace_progressive_chroma=False
+        )
+    ),
+    BenchmarkCase(
+        name='telecine_time',
+        function='telecine',
+        build=lambda sources: vsfieldkit.telecine(
+            sources.progressive,
+            tff=True,
+            fpsnum=30000,
+            fpsden=1001
+        )
+    ),
+    BenchmarkCase(
+        name='detelecine_pattern',
+        function='detelecine',
+        build=lambda sources: vsfieldkit.detelecine(
+            vsfieldkit.telecine(
+                sources.progressive,
+                tff=True,
+                pulldown_pattern=vsfieldkit.NTSC_FILM_PULLDOWN
+            ),
+            vsfieldkit.NTSC_FILM_PULLDOWN,
+            tff=True
+        )
+    ),
+    BenchmarkCase(
+        name='match_fields',
+        function='match_fields',
+        build=lambda sources: vsfieldkit.match_fields(
+            vsfieldkit.telecine(
+                sources.progressive,
+                tff=True,
+                pulldown_pattern=vsfieldkit.NTSC_FILM_PULLDOWN
+            ),
+            tff=True
+        )
+    ),
+    BenchmarkCase(
+        name='resample_as_progressive',
+        function='resample_as_progressive',
+        build=lambda sources: vsfieldkit.resample_as_progressive(
+            sources.interlaced
+        )
+    ),
+    BenchmarkCase(
+        name='upsample_as_progressive',
+        function='upsample_as_progressive',
+        build=lambda sources: vsfieldkit.upsample_as_progressive(
+            sources.interlaced
+        )
+    ),
+    BenchmarkCase(
+        name='upsample_as_progressive_nnedi3',
+        function='prepare_nnedi3_chroma_upsampler',
+        build=lambda sources: vsfieldkit.upsample_as_progressive(
+            sources.interlaced,
+            kernel=prepare_nnedi3_chroma_upsampler()
+        )
+    ),
+    BenchmarkCase(
+        name='fill_analog_frame_ends',
+        function='fill_analog_frame_ends',
+        build=lambda sources: vsfieldkit.fill_analog_frame_ends(
+            sources.interlaced
+        )
+    ),
+)
@@ -0,0 +1,219 @@
+"""Measures frames per second and peak memory of vsfieldkit functions.
+
+Every case runs in its own Python process so that peak memory reflects that
+case alone. Results are written as JSON so they can be compared between
+releases::
+
+    python benchmarks/run.py --sizes SD HD --frames 200 --output bench.json
+
+The vsfieldkit in this checkout is benchmarked, not an installed copy.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from fnmatch import fnmatch
+from typing import Any, Iterable, Mapping, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+import vapoursynth  # noqa: E402
+from cases import CASES  # noqa: E402
+from sources import FORMATS, SIZES, build_sources  # noqa: E402
+from vapoursynth import Error, VideoNode, core  # noqa: E402
+
+import vsfieldkit  # noqa: E402
+
+RESULTS_VERSION = 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cases', nargs='+', default=['*'],
+                        help='Case names or glob patterns to run.')
+    parser.add_argument('--sizes', nargs='+', default=list(SIZES),
+                        choices=list(SIZES))
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS),
+                        choices=list(FORMATS))
+    parser.add_argument('--frames', type=int, default=100,
+                        help='Frames to render per case, after warm-up.')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='core.num_threads for rendering. Defaults to '
+                             "VapourSynth's own default.")
+    parser.add_argument('--output', default=None,
+                        help='Path of the JSON results. Defaults to stdout.')
+    parser.add_argument('--run-case', nargs=3,
+                        metavar=('CASE', 'SIZE', 'FORMAT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        case_name, size, format = args.run_case
+        result = run_case(case_name, size, format, args.frames, args.threads)
+        json.dump(result, sys.stdout)
+        return
+
+    results = [
+        run_case_in_subprocess(case_name, size, format, args.frames,
+                               args.threads)
+        for case_name in selected_cases(args.cases)
+        for size in args.sizes
+        for format in args.formats
+    ]
+    report = {
+        'version': RESULTS_VERSION,
+        'environment': environment(args.threads),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+def selected_cases(patterns: Iterable[str]):
+    return [
+        case.name
+        for case in CASES
+        if any(fnmatch(case.name, pattern) for pattern in patterns)
+    ]
+
+
+def environment(threads: Optional[int]) -> Mapping[str, Any]:
+    api_version = getattr(vapoursynth, '__api_version__', None)
+    return {
+        'vsfieldkit': '.'.join(str(part) for part in vsfieldkit.VERSION),
+        'vapoursynth': str(getattr(vapoursynth, '__version__', '')),
+        'vapoursynth_api': list(api_version) if api_version else None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'num_threads': threads or core.num_threads,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def run_case_in_subprocess(
+    case_name: str,
+    size: str,
+    format: str,
+    frames: int,
+    threads: Optional[int]
+) -> Mapping[str, Any]:
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        '--run-case', case_name, size, format,
+        '--frames', str(frames),
+    ]
+    if threads:
+        command += ['--threads', str(threads)]
+    print(f'{case_name} {size} {format}', file=sys.stderr)
+    completed = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    if completed.returncode != 0:
+        return {
+            **case_key(case_name, size, format),
+            'status': 'failed',
+            'reason': completed.stderr.strip().splitlines()[-1:],
+        }
+    return json.loads(completed.stdout)
+
+
+def case_key(case_name: str, size: str, format: str) -> Mapping[str, Any]:
+    case = next(case for case in CASES if case.name == case_name)
+    return {
+        'case': case.name,
+        'function': case.function,
+        'size': size,
+        'format': format,
+    }
+
+
+def run_case(
+    case_name: str,
+    size: str,
+    format: str,
+    frames: int,
+    threads: Optional[int]
+) -> Mapping[str, Any]:
+    if threads:
+        core.num_threads = threads
+    case = next(case for case in CASES if case.name == case_name)
+    result = dict(case_key(case_name, size, format))
+
+    # Enough source for the slowest-consuming case (telecine by pattern uses
+    # 4 frames for every 5 it outputs).
+    sources = build_sources(size, format, length=frames * 2 + 10)
+    baseline_rss = peak_rss_bytes()
+    build_start = time.perf_counter()
+    try:
+        clip = case.build(sources)
+    except Error as e:
+        result.update(status='skipped', reason=str(e))
+        return result
+    build_seconds = time.perf_counter() - build_start
+
+    frames = min(frames, len(clip) - 1)
+    # Warm-up frame isn't timed, so one-off setup such as plugin
+    # initialization doesn't skew short runs.
+    clip.get_frame(0)
+    render_start = time.perf_counter()
+    render(clip[1:frames + 1])
+    render_seconds = time.perf_counter() - render_start
+
+    result.update(
+        status='ok',
+        width=clip.width,
+        height=clip.height,
+        output_format=clip.format.name,
+        frames=frames,
+        num_threads=core.num_threads,
+        build_seconds=build_seconds,
+        render_seconds=render_seconds,
+        fps=frames / render_seconds if render_seconds else None,
+        baseline_rss_bytes=baseline_rss,
+        peak_rss_bytes=peak_rss_bytes(),
+    )
+    return result
+
+
+def render(clip: VideoNode) -> None:
+    if hasattr(clip, 'frames'):
+        for _ in clip.frames(close=True):
+            pass
+    else:
+        for n in range(len(clip)):
+            clip.get_frame(n)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident memory of this process so far, or None if it can't be
+    measured on this platform."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows, where psutil can report the peak working
+        # set instead.
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kibibytes everywhere except macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Synthetic interlaced and progressive sources for benchmarking.
+
+Sources are built from core filters only, so no source plugin or sample
+footage is needed. A tile of flat blocks is upscaled into a soft, detailed
+canvas, an Expr layer adds fine diagonal detail, and crops of the canvas
+pan across it to produce motion. The interlaced source is woven from a
+double-rate pan so that its fields are genuinely from different moments.
+"""
+from fractions import Fraction
+from typing import NamedTuple
+
+from vapoursynth import VideoNode, core
+
+try:
+    from vapoursynth import PresetVideoFormat
+except ImportError:
+    from vapoursynth import PresetFormat as PresetVideoFormat
+
+SIZES = {
+    'SD': (720, 480),
+    'HD': (1920, 1080),
+    'UHD': (3840, 2160),
+}
+
+FORMATS = {
+    '8-bit': PresetVideoFormat.YUV420P8,
+    '10-bit': PresetVideoFormat.YUV420P10,
+    '16-bit': PresetVideoFormat.YUV420P16,
+    'float': PresetVideoFormat.YUV420PS,
+}
+
+INTERLACED_FPS = Fraction(30000, 1001)
+PROGRESSIVE_FPS = Fraction(24000, 1001)
+
+# Positions in the looping pan. The loop is kept short so the source graph
+# stays small no matter how many frames are rendered.
+_PAN_POSITIONS = 16
+_PAN_STEP = 4
+_TILE_BLOCKS = 8
+
+
+class BenchmarkSources(NamedTuple):
+    interlaced: VideoNode
+    """Top-field-first interlaced clip with motion between fields."""
+    progressive: VideoNode
+    """Progressive clip for functions that interlace."""
+
+
+def build_sources(
+    size: str,
+    format: str,
+    length: int
+) -> BenchmarkSources:
+    width, height = SIZES[size]
+    video_format = core.get_video_format(FORMATS[format])
+
+    # Double-rate pan, woven into interlaced frames.
+    pan = _panning_clip(width, height, video_format, length * 2)
+    pan = pan.std.AssumeFPS(
+        fpsnum=INTERLACED_FPS.numerator * 2,
+        fpsden=INTERLACED_FPS.denominator
+    )
+    fields = pan.std.SeparateFields(tff=True).std.SelectEvery(
+        cycle=4,
+        offsets=(0, 3)
+    )
+    interlaced = fields.std.DoubleWeave(tff=True)[::2]
+    interlaced = interlaced.std.SetFieldBased(2)
+
+    progressive = _panning_clip(width, height, video_format, length)
+    progressive = progressive.std.AssumeFPS(
+        fpsnum=PROGRESSIVE_FPS.numerator,
+        fpsden=PROGRESSIVE_FPS.denominator
+    ).std.SetFieldBased(0)
+
+    return BenchmarkSources(interlaced=interlaced, progressive=progressive)
+
+
+def _panning_clip(width, height, video_format, length) -> VideoNode:
+    margin = _PAN_POSITIONS * _PAN_STEP
+    canvas = _detailed_canvas(width + margin, height + margin, video_format)
+    positions = [
+        canvas.std.CropAbs(
+            width=width,
+            height=height,
+            left=position * _PAN_STEP,
+            top=position * _PAN_STEP // 2
+        )
+        for position in range(_PAN_POSITIONS)
+    ]
+    loop = core.std.Splice(positions)
+    return loop.std.Loop(times=-(-length // _PAN_POSITIONS))[:length]
+
+
+def _detailed_canvas(width, height, video_format) -> VideoNode:
+    blocks = []
+    for row in range(_TILE_BLOCKS):
+        row_blocks = [
+            core.std.BlankClip(
+                width=8,
+                height=8,
+                length=1,
+                format=PresetVideoFormat.YUV444P8,
+                color=(
+                    16 + (row * 37 + col * 53) % 220,
+                    128 + (row * 11 - col * 7) % 64 - 32,
+                    128 + (col * 13 - row * 5) % 64 - 32,
+                )
+            )
+            for col in range(_TILE_BLOCKS)
+        ]
+        blocks.append(core.std.StackHorizontal(row_blocks))
+    tile = core.std.StackVertical(blocks)
+    soft = tile.resize.Bicubic(width=width, height=height)
+    # Hard-edged stripes from a point-resized copy add high frequency detail.
+    sharp = tile.std.Transpose().resize.Point(width=width, height=height)
+    detailed = core.std.Expr((soft, sharp), ('x 3 * y + 4 /', 'x', 'x'))
+    # Round the final format only once, with dithering as a real source would.
+    return detailed.resize.Point(
+        format=video_format.id,
+        dither_type='error_diffusion'
+    )
@@ -0,0 +1,270 @@
+"""Measures how vsfieldkit graphs scale with VapourSynth's thread count and
+how much of the render the GIL is held for.
+
+Several vsfieldkit paths run Python for each frame (FrameEval and ModifyFrame
+callbacks). Those callbacks hold the GIL, so beyond a certain thread count
+they serialize rendering. Each case is rendered with core.num_threads from 1
+up to the machine's core count, each in its own process::
+
+    python benchmarks/thread_scaling.py --size HD --output scaling.json
+
+The synthetic sources only use core filters, so any time the GIL is held
+during rendering is spent in vsfieldkit's callbacks.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, List, Mapping, Sequence
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+from cases import CASES  # noqa: E402
+from run import case_key, environment, render, selected_cases  # noqa: E402
+from sources import (FORMATS, SIZES, BenchmarkSources,  # noqa: E402
+                     build_sources)
+from vapoursynth import Error, VideoNode, core  # noqa: E402
+
+RESULTS_VERSION = 1
+
+
+class GilProbe:
+    """Estimates how much of the time other threads hold the GIL. A thread
+    repeatedly sleeps for a short interval; a wake-up that's late by more
+    than the idle oversleep means it was waiting for the GIL. The share of
+    late wake-ups approximates the share of wall time the GIL was busy.
+
+    Once the worker threads occupy every core, the operating system also
+    wakes the probe late, so the share on its own overstates GIL use at high
+    thread counts. run_case subtracts the share measured while rendering a
+    graph without Python callbacks at the same thread count.
+    """
+
+    def __init__(self, interval: float = 0.0005):
+        self.interval = interval
+        self.samples = 0
+        self.late_samples = 0
+        self.waited_seconds = 0.0
+        self._threshold = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def calibrate(self, seconds: float = 0.25) -> None:
+        """Measures oversleep while nothing else is running."""
+        oversleeps = sorted(self._oversleeps(seconds))
+        p99 = oversleeps[int(len(oversleeps) * 0.99)]
+        self._threshold = p99 + 0.0001
+
+    def __enter__(self) -> 'GilProbe':
+        if self._threshold is None:
+            self.calibrate()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    @property
+    def busy_fraction(self) -> float:
+        return self.late_samples / self.samples if self.samples else 0.0
+
+    def _oversleeps(self, seconds: float) -> List[float]:
+        oversleeps = []
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            time.sleep(self.interval)
+            oversleeps.append(time.perf_counter() - start - self.interval)
+        return oversleeps
+
+    def _run(self) -> None:
+        interval = self.interval
+        threshold = self._threshold
+        while not self._stopped.is_set():
+            start = time.perf_counter()
+            time.sleep(interval)
+            late_by = time.perf_counter() - start - interval
+            self.samples += 1
+            if late_by > threshold:
+                self.late_samples += 1
+                self.waited_seconds += late_by
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cases', nargs='+', default=['*'],
+                        help='Case names or glob patterns to run.')
+    parser.add_argument('--size', default='HD', choices=list(SIZES))
+    parser.add_argument('--format', default='8-bit', choices=list(FORMATS))
+    parser.add_argument('--frames', type=int, default=200,
+                        help='Frames to render per thread count.')
+    parser.add_argument('--thread-counts', nargs='+', type=int,
+                        default=default_thread_counts(),
+                        help='Defaults to powers of two up to the core '
+                             'count, plus the core count.')
+    parser.add_argument('--output', default=None,
+                        help='Path of the JSON results. Defaults to stdout.')
+    parser.add_argument('--run-case', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--threads', type=int, default=None,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        result = run_case(args.run_case, args.size, args.format, args.frames,
+                          args.threads)
+        json.dump(result, sys.stdout)
+        return
+
+    results = [
+        scaling_curve(case_name, args.size, args.format, args.frames,
+                      args.thread_counts)
+        for case_name in selected_cases(args.cases)
+    ]
+    report = {
+        'version': RESULTS_VERSION,
+        'environment': environment(None),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+def default_thread_counts() -> List[int]:
+    cpu_count = os.cpu_count() or 1
+    counts = []
+    threads = 1
+    while threads < cpu_count:
+        counts.append(threads)
+        threads *= 2
+    counts.append(cpu_count)
+    return counts
+
+
+def scaling_curve(
+    case_name: str,
+    size: str,
+    format: str,
+    frames: int,
+    thread_counts: Sequence[int]
+) -> Mapping[str, Any]:
+    points = []
+    for threads in thread_counts:
+        print(f'{case_name} {size} {format} threads={threads}',
+              file=sys.stderr)
+        completed = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(BENCHMARKS_DIR, 'thread_scaling.py'),
+                '--run-case', case_name,
+                '--size', size,
+                '--format', format,
+                '--frames', str(frames),
+                '--threads', str(threads),
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+        if completed.returncode != 0:
+            points.append({
+                'num_threads': threads,
+                'status': 'failed',
+                'reason': completed.stderr.strip().splitlines()[-1:],
+            })
+            continue
+        point = json.loads(completed.stdout)
+        if point['status'] == 'skipped':
+            return {**case_key(case_name, size, format), **point}
+        points.append(point)
+
+    single_thread_fps = next(
+        (
+            point['fps']
+            for point in points
+            if point.get('num_threads') == 1 and point.get('fps')
+        ),
+        None
+    )
+    for point in points:
+        if single_thread_fps and point.get('fps'):
+            point['speedup'] = point['fps'] / single_thread_fps
+            point['efficiency'] = point['speedup'] / point['num_threads']
+    return {
+        **case_key(case_name, size, format),
+        'status': 'ok',
+        'points': points,
+    }
+
+
+def run_case(
+    case_name: str,
+    size: str,
+    format: str,
+    frames: int,
+    threads: int
+) -> Mapping[str, Any]:
+    core.num_threads = threads
+    case = next(case for case in CASES if case.name == case_name)
+    sources = build_sources(size, format, length=frames * 2 + 10)
+    try:
+        clip = case.build(sources)
+    except Error as e:
+        return {'status': 'skipped', 'reason': str(e)}
+
+    frames = min(frames, len(clip) - 1)
+    clip.get_frame(0)
+    probe = GilProbe()
+    probe.calibrate()
+    with probe:
+        render_start = time.perf_counter()
+        render(clip[1:frames + 1])
+        render_seconds = time.perf_counter() - render_start
+
+    control = control_clip(sources)
+    control.get_frame(0)
+    control_probe = GilProbe()
+    control_probe.calibrate()
+    with control_probe:
+        render(control[1:frames + 1])
+
+    gil_busy_fraction = max(
+        probe.busy_fraction - control_probe.busy_fraction,
+        0.0
+    )
+    return {
+        'status': 'ok',
+        'num_threads': core.num_threads,
+        'frames': frames,
+        'render_seconds': render_seconds,
+        'fps': frames / render_seconds if render_seconds else None,
+        'gil_busy_fraction': gil_busy_fraction,
+        'gil_held_seconds': gil_busy_fraction * render_seconds,
+        'gil_probe_samples': probe.samples,
+        'gil_probe_late_fraction': probe.busy_fraction,
+        'gil_probe_waited_seconds': probe.waited_seconds,
+        'control_late_fraction': control_probe.busy_fraction,
+    }
+
+
+def control_clip(sources: BenchmarkSources) -> VideoNode:
+    """Keeps the worker threads as busy as a case does without running any
+    Python, so late probe wake-ups while rendering it come from operating
+    system scheduling alone."""
+    clip = sources.interlaced
+    for _ in range(4):
+        clip = clip.std.Convolution([1] * 9)
+    return clip
+
+
+if __name__ == '__main__':
+    main()
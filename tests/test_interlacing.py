@@ -0,0 +1,93 @@
+import pytest
+
+vs = pytest.importorskip('vapoursynth')
+interlacing = pytest.importorskip('vsfieldkit.interlacing')
+
+core = vs.core
+
+
+def _numbered_clip(length):
+    return core.std.Splice([
+        core.std.BlankClip(
+            format=vs.GRAY8,
+            width=16,
+            height=8,
+            length=1,
+            color=[frame_num * 4]
+        )
+        for frame_num in range(length)
+    ])
+
+
+def _intact_frames(length, pulldown_pattern, phase):
+    """Original frames with both of their fields in a clip telecined from
+    length frames and trimmed of its first phase frames."""
+    pattern_parts = interlacing._pulldown_pattern_parts(pulldown_pattern)
+    offsets_pattern = interlacing._pulldown_pattern_to_field_offsets(
+        pattern_parts
+    )
+    orig_field_cycle_size = len(pattern_parts) * 2
+    fields = []
+    cycle_idx = 0
+    while True:
+        for field_offset in offsets_pattern:
+            field_num = cycle_idx * orig_field_cycle_size + field_offset
+            if field_num >= length * 2:
+                break
+            fields.append(field_num)
+        else:
+            cycle_idx += 1
+            continue
+        break
+    fields = set(fields[phase * 2:len(fields) // 2 * 2])
+    return sorted(
+        field_num // 2
+        for field_num in fields
+        if field_num % 2 == 0 and field_num + 1 in fields
+    )
+
+
+@pytest.mark.parametrize('pulldown_pattern, phase', (
+    ('2:3', 0),
+    ('2:3', 4),
+    ('3:2', 3),
+    ('2:3:3:2', 3),
+    ('2:2:2:2:2:2:2:2:2:2:2:3', 7),
+))
+# Whole pulldown cycles, so telecine output has no partial cycle.
+@pytest.mark.parametrize('length', (24, 48))
+def test_detelecine_restores_intact_frames(pulldown_pattern, phase, length):
+    clip = _numbered_clip(length)
+    telecined = interlacing.telecine(
+        clip,
+        tff=True,
+        pulldown_pattern=pulldown_pattern
+    )
+    restored = interlacing.detelecine(
+        telecined[phase:],
+        pulldown_pattern,
+        tff=True,
+        phase=phase
+    ).std.PlaneStats()
+
+    restored_values = []
+    for frame in restored.frames():
+        assert frame.props['PlaneStatsMin'] == frame.props['PlaneStatsMax']
+        restored_values.append(frame.props['PlaneStatsMin'])
+    assert restored_values == [
+        frame_num * 4
+        for frame_num in _intact_frames(length, pulldown_pattern, phase)
+    ]
+
+
+def test_detelecine_rejects_clip_without_intact_frames():
+    # Two frames into the 2:3 cycle, a single frame holds a repeated field
+    # and a field of the following original frame.
+    with pytest.raises(ValueError):
+        interlacing.detelecine(_numbered_clip(1), '2:3', tff=True, phase=2)
+
+
+def test_detelecine_rejects_pattern_with_single_parity_frames():
+    # The second frame of each 4:1 cycle only gets a top field.
+    with pytest.raises(ValueError):
+        interlacing.detelecine(_numbered_clip(10), '4:1', tff=True)
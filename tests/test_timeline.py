@@ -0,0 +1,116 @@
+import pytest
+
+vs = pytest.importorskip('vapoursynth')
+timeline = pytest.importorskip('vsfieldkit.timeline')
+util = pytest.importorskip('vsfieldkit.util')
+
+
+def _timeline(props, values):
+    builder = timeline._TimelineBuilder(props, single_prop=len(props) == 1)
+    for value in values:
+        builder.append(value)
+    return builder.build()
+
+
+def test_timeline_index_keeps_each_scan(tmp_path):
+    source_path = tmp_path / 'source.mkv'
+    source_path.write_bytes(b'source')
+    index_path = str(tmp_path / 'source.mkv.vsfieldkit-index')
+    combed_key = timeline.timeline_index_key(
+        str(source_path),
+        props=('_Combed',),
+        num_frames=4,
+        min_run_length=1
+    )
+    field_order_key = timeline.timeline_index_key(
+        str(source_path),
+        props=('_FieldBased',),
+        num_frames=4,
+        min_run_length=1
+    )
+    merged_combed_key = timeline.timeline_index_key(
+        str(source_path),
+        props=('_Combed',),
+        num_frames=4,
+        min_run_length=2
+    )
+    combed = _timeline(('_Combed',), (0, 1, 1, 0))
+    field_order = _timeline(('_FieldBased',), (2, 2, 1, 1))
+    merged_combed = _timeline(('_Combed',), (1, 1, 1, 1))
+
+    timeline.write_timeline_index(index_path, combed_key, combed)
+    timeline.write_timeline_index(index_path, field_order_key, field_order)
+    timeline.write_timeline_index(
+        index_path,
+        merged_combed_key,
+        merged_combed
+    )
+
+    for key, expected in (
+        (combed_key, combed),
+        (field_order_key, field_order),
+        (merged_combed_key, merged_combed),
+    ):
+        assert list(timeline.read_timeline_index(index_path, key)) == list(
+            expected
+        )
+
+
+def test_timeline_index_drops_scans_of_changed_source(tmp_path):
+    source_path = tmp_path / 'source.mkv'
+    source_path.write_bytes(b'source')
+    index_path = str(tmp_path / 'source.mkv.vsfieldkit-index')
+    old_key = timeline.timeline_index_key(
+        str(source_path),
+        props=('_Combed',),
+        num_frames=4
+    )
+    timeline.write_timeline_index(
+        index_path,
+        old_key,
+        _timeline(('_Combed',), (0, 0, 1, 1))
+    )
+
+    source_path.write_bytes(b'changed source')
+    new_key = timeline.timeline_index_key(
+        str(source_path),
+        props=('_FieldBased',),
+        num_frames=4
+    )
+    timeline.write_timeline_index(
+        index_path,
+        new_key,
+        _timeline(('_FieldBased',), (1, 1, 1, 1))
+    )
+
+    assert timeline.read_timeline_index(index_path, old_key) is None
+    assert timeline._read_index_entries(index_path).keys() == {
+        timeline._entry_id(new_key)
+    }
+
+
+def test_alternating_scans_reuse_index(tmp_path, monkeypatch):
+    source_path = tmp_path / 'source.mkv'
+    source_path.write_bytes(b'source')
+    clip = vs.core.std.BlankClip(format=vs.GRAY8, width=8, height=8, length=4)
+    clip = clip.std.SetFrameProp('_Combed', intval=1)
+    clip = clip.std.SetFrameProp('_FieldBased', intval=2)
+
+    scanned_props = []
+    scan_frame_props = util._scan_frame_props
+
+    def counting_scan(clip, props, *args, **kwargs):
+        scanned_props.append(props)
+        return scan_frame_props(clip, props, *args, **kwargs)
+
+    monkeypatch.setattr(util, '_scan_frame_props', counting_scan)
+
+    for _ in range(2):
+        combed = list(util.group_by_combed(clip, source_path=str(source_path)))
+        field_order = list(
+            util.group_by_field_order(clip, source_path=str(source_path))
+        )
+        assert [is_combed for is_combed, _ in combed] == [True]
+        assert [order for order, _ in field_order] == [vs.FIELD_TOP]
+
+    assert scanned_props == [('_Combed',), ('_FieldBased',)]
@@ -1,23 +1,36 @@
+from vsfieldkit.analysis import PulldownCadence, detect_pulldown, match_fields
 from vsfieldkit.deinterlacing import (bob, resample_as_progressive,
                                       upsample_as_progressive)
-from vsfieldkit.interlacing import telecine, weave_fields
+from vsfieldkit.inspection import (FormatConversion, FrameRequestTrace,
+                                   GraphExplanation, GraphProfile,
+                                   HelperProfile, NodeProfile, NodeSummary,
+                                   NodeTrace, explain, profile,
+                                   trace_frame_requests)
+from vsfieldkit.interlacing import detelecine, telecine, weave_fields
 from vsfieldkit.output import output_frame_inferred_y4m
 from vsfieldkit.repair import fill_analog_frame_ends
-from vsfieldkit.scanning import scan_interlaced
+from vsfieldkit.scanning import scan_interlaced, scan_interlaced_chunk
+from vsfieldkit.timeline import FramePropRun, FramePropTimeline
 from vsfieldkit.types import (ChromaSubsampleScanning, Factor, FormatSpecifier,
+                              InterlacedScanEngine,
                               InterlacedScanPostProcessor, PulldownPattern,
                               Resizer)
 from vsfieldkit.util import (annotate_bobbed_fields, assume_bff,
                              assume_progressive, assume_tff, double,
-                             group_by_combed, group_by_field_order)
+                             group_by_combed, group_by_field_order,
+                             process_segments, scan_frame_props)
 
 VERSION = 2, 1, 0
 
 SCAN_BLENDED = ChromaSubsampleScanning.SCAN_BLENDED
 SCAN_LATEST = ChromaSubsampleScanning.SCAN_LATEST
+SCAN_LATEST_SUBSAMPLED = ChromaSubsampleScanning.SCAN_LATEST_SUBSAMPLED
 SCAN_UPSAMPLED = ChromaSubsampleScanning.SCAN_UPSAMPLED
 
 BLEND_VERTICALLY = InterlacedScanPostProcessor.BLEND_VERTICALLY
+BLEND_VERTICALLY_CONVOLVED = (
+    InterlacedScanPostProcessor.BLEND_VERTICALLY_CONVOLVED
+)
 
 ADVANCED_PULLDOWN = PulldownPattern.ADVANCED_PULLDOWN
 EURO_PULLDOWN = PulldownPattern.EURO_PULLDOWN
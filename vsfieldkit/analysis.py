@@ -0,0 +1,372 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import (Any, Dict, List, NamedTuple, Optional, Sequence, Tuple,
+                    Union)
+
+from vapoursynth import (ColorFamily, Error, SampleType, VideoFrame, VideoNode,
+                         core)
+
+try:
+    from vapoursynth import PresetVideoFormat
+except ImportError:
+    from vapoursynth import PresetFormat as PresetVideoFormat
+
+from vsfieldkit.interlacing import (_pulldown_pattern_parts,
+                                    _pulldown_pattern_to_field_offsets,
+                                    weave_fields)
+from vsfieldkit.timeline import FramePropTimeline
+from vsfieldkit.types import PulldownPattern
+from vsfieldkit.util import _prefetched_frames
+
+# Keeps the metric ratios finite on perfectly static content.
+_METRIC_EPSILON = 1e-6
+
+# Field match codes, numbered as by the VIVTC plugin's VFM.
+_MATCH_PREVIOUS = 0
+_MATCH_CURRENT = 1
+_MATCH_NEXT = 2
+
+# Shared by every match_fields node so that building graphs doesn't leave
+# idle pools behind. Created on first use.
+_comb_scoring_pool: Optional[ThreadPoolExecutor] = None
+_comb_scoring_pool_lock = Lock()
+
+
+class PulldownCadence(NamedTuple):
+    pulldown_pattern: Union[str, PulldownPattern]
+    """The pattern, as it was given to the detector."""
+    phase: int
+    """How many interlaced frames into the pattern's cycle the first frame of
+    the run is, as accepted by :py:func:`vsfieldkit.detelecine`."""
+
+
+def detect_pulldown(
+    clip: VideoNode,
+    *,
+    tff: bool,
+    pulldown_patterns: Sequence[Union[str, PulldownPattern]] = tuple(
+        PulldownPattern
+    ),
+    window: int = 30,
+    threshold: float = 0.5,
+    proxy_width: int = 128,
+    proxy_height: int = 64,
+    batch_size: int = 1024,
+    prefetch: int = 0
+) -> FramePropTimeline:
+    """Finds the pulldown pattern and phase of each section of a telecined
+    clip from small, luma-only proxies of its fields. Returns a timeline
+    whose values are PulldownCadence tuples. Windows where no pattern could
+    be told apart (e.g. still frames) take on the cadence of the run before
+    them, so a single None run is only returned if no window of the clip
+    could be decided."""
+    np = _import_numpy()
+    if window < 1:
+        raise ValueError('window must be at least 1 frame.')
+
+    proxy = clip.std.ShufflePlanes(
+        planes=0,
+        colorfamily=ColorFamily.GRAY
+    ).std.SeparateFields(tff=tff).resize.Bilinear(
+        width=proxy_width,
+        height=proxy_height,
+        format=PresetVideoFormat.GRAYS
+    )
+    adjacent_diffs, same_parity_diffs = _field_differences(
+        np,
+        proxy,
+        batch_size=batch_size,
+        prefetch=prefetch
+    )
+
+    num_fields = len(adjacent_diffs)
+    window_starts = np.arange(0, num_fields, window * 2)
+    field_numbers = np.arange(num_fields)
+    cadences = []
+    cadence_scores = []
+    for pulldown_pattern in pulldown_patterns:
+        same_frame, repeated = _pulldown_field_masks(np, pulldown_pattern)
+        field_cycle_size = len(same_frame)
+        for phase in range(field_cycle_size // 2):
+            positions = (field_numbers + phase * 2) % field_cycle_size
+            ratios = [
+                _window_ratios(
+                    np,
+                    adjacent_diffs,
+                    same_frame[positions],
+                    window_starts
+                )
+            ]
+            if repeated.any():
+                ratios.append(_window_ratios(
+                    np,
+                    same_parity_diffs,
+                    repeated[positions],
+                    window_starts
+                ))
+            ratios = np.stack(ratios)
+            valid = ~np.isnan(ratios)
+            score = (
+                np.where(valid, ratios, 0).sum(axis=0)
+                / np.maximum(valid.sum(axis=0), 1)
+            )
+            cadence_scores.append(
+                np.where(valid.any(axis=0), score, np.inf)
+            )
+            cadences.append((pulldown_pattern, phase, field_cycle_size // 2))
+
+    if not cadences:
+        raise ValueError('At least one pulldown pattern is required.')
+    scores = np.stack(cadence_scores)
+    best = scores.argmin(axis=0)
+    decided = scores[best, np.arange(len(window_starts))] <= threshold
+    window_cadences = [
+        int(cadence_idx) if is_decided else None
+        for cadence_idx, is_decided in zip(best, decided)
+    ]
+    return _cadence_timeline(
+        window_cadences,
+        cadences,
+        window=window,
+        num_frames=len(clip)
+    )
+
+
+def match_fields(
+    clip: VideoNode,
+    *,
+    tff: bool,
+    pixel_threshold: float = 9 / 255,
+    combed_threshold: float = 0.001
+) -> VideoNode:
+    """Matches each frame's first field with the second field of the
+    previous, current or next frame, whichever weaves with the least
+    combing. Frames get the match in a VFMMatch property, the comb score of
+    each candidate in a FieldMatchCombScores property, and a _Combed
+    property marking frames where even the best match stayed combed."""
+    np = _import_numpy()
+    fields = clip.std.SeparateFields(tff=tff)
+    first_fields = fields[::2]
+    second_fields = fields[1::2]
+    # The current match comes first so that it wins ties.
+    candidates = (
+        (_MATCH_CURRENT, clip),
+        (_MATCH_PREVIOUS, weave_fields(core.std.Interleave((
+            first_fields,
+            (second_fields[0] + second_fields)[:-1]
+        )))),
+        (_MATCH_NEXT, weave_fields(core.std.Interleave((
+            first_fields,
+            (second_fields + second_fields[-1])[1:]
+        )))),
+    )
+    matches = [match for match, _candidate in candidates]
+    candidate_clips = [candidate for _match, candidate in candidates]
+
+    if clip.format.sample_type == SampleType.FLOAT:
+        peak = 1.0
+    else:
+        peak = (1 << clip.format.bits_per_sample) - 1
+    min_comb_product = (pixel_threshold * peak) ** 2
+
+    def select_match(n: int, f: Sequence[VideoFrame]) -> VideoFrame:
+        scores = list(_comb_scoring_executor().map(
+            lambda frame: _comb_score(np, frame, min_comb_product),
+            f
+        ))
+        best = scores.index(min(scores))
+        matched = f[best].copy()
+        matched.props['VFMMatch'] = matches[best]
+        matched.props['FieldMatchCombScores'] = scores
+        matched.props['_Combed'] = int(scores[best] > combed_threshold)
+        return matched
+
+    return clip.std.ModifyFrame(
+        clips=candidate_clips,
+        selector=select_match
+    )
+
+
+def _comb_scoring_executor() -> ThreadPoolExecutor:
+    """The thread pool candidates are scored on, with as many workers as
+    VapourSynth has threads when it's first used."""
+    global _comb_scoring_pool
+    with _comb_scoring_pool_lock:
+        if _comb_scoring_pool is None:
+            _comb_scoring_pool = ThreadPoolExecutor(
+                max_workers=core.num_threads,
+                thread_name_prefix='vsfieldkit-comb-scoring'
+            )
+        return _comb_scoring_pool
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        raise Error('Missing required Python package: numpy') from None
+    return numpy
+
+
+def _plane_array(np: Any, frame: VideoFrame, plane: int) -> Any:
+    """NumPy view of a frame's plane, sharing the frame's memory."""
+    if hasattr(frame, 'get_read_array'):
+        # VapourSynth API 3
+        return np.asarray(frame.get_read_array(plane))
+    return np.asarray(frame[plane])
+
+
+def _comb_score(
+    np: Any,
+    frame: VideoFrame,
+    min_comb_product: float
+) -> float:
+    """Share of luma samples that differ from the lines above and below in
+    the same direction, as lines woven from mismatched fields do. Reads the
+    plane in place, only allocating for the differences."""
+    plane = _plane_array(np, frame, 0)
+    middle = plane[1:-1]
+    above_diffs = np.subtract(middle, plane[:-2], dtype=np.float32)
+    below_diffs = np.subtract(middle, plane[2:], dtype=np.float32)
+    comb_products = np.multiply(above_diffs, below_diffs, out=above_diffs)
+    return float(
+        np.count_nonzero(comb_products > min_comb_product)
+        / comb_products.size
+    )
+
+
+def _field_differences(
+    np: Any,
+    fields: VideoNode,
+    batch_size: int,
+    prefetch: int
+) -> Any:
+    """Mean absolute differences of each field from the field before it and
+    from the field of the same parity before that. Fields are compared in
+    batches, carrying the last two fields over to the next batch."""
+    num_fields = len(fields)
+    adjacent_diffs = np.full(num_fields, np.nan)
+    same_parity_diffs = np.full(num_fields, np.nan)
+    frames = _prefetched_frames(fields, prefetch)
+    previous = np.empty((0, fields.height, fields.width), dtype=np.float32)
+    for batch_start in range(0, num_fields, batch_size):
+        batch_end = min(batch_start + batch_size, num_fields)
+        batch = np.stack([
+            _plane_array(np, next(frames), 0)
+            for _n in range(batch_start, batch_end)
+        ])
+        stacked = np.concatenate((previous, batch))
+        first_field = batch_start - len(previous)
+        adjacent_diffs[first_field + 1:batch_end] = (
+            np.abs(stacked[1:] - stacked[:-1]).mean(axis=(1, 2))
+        )
+        same_parity_diffs[first_field + 2:batch_end] = (
+            np.abs(stacked[2:] - stacked[:-2]).mean(axis=(1, 2))
+        )
+        previous = stacked[-2:]
+    return adjacent_diffs, same_parity_diffs
+
+
+def _pulldown_field_masks(
+    np: Any,
+    pulldown_pattern: Union[str, PulldownPattern]
+) -> Any:
+    """For each field position in a pulldown cycle, whether the field comes
+    from the same original frame as the field before it and whether it
+    repeats the field of the same parity before that."""
+    pattern_parts = _pulldown_pattern_parts(pulldown_pattern)
+    offsets_pattern = _pulldown_pattern_to_field_offsets(pattern_parts)
+    field_cycle_size = len(offsets_pattern)
+    orig_field_cycle_size = len(pattern_parts) * 2
+    # Two cycles' worth, so the first fields of a cycle can look back.
+    field_ids = [
+        offsets_pattern[idx % field_cycle_size]
+        + (idx // field_cycle_size) * orig_field_cycle_size
+        for idx in range(field_cycle_size * 2)
+    ]
+    positions = range(field_cycle_size, field_cycle_size * 2)
+    same_frame = np.array([
+        field_ids[idx] // 2 == field_ids[idx - 1] // 2
+        for idx in positions
+    ])
+    repeated = np.array([
+        field_ids[idx] == field_ids[idx - 2]
+        for idx in positions
+    ])
+    return same_frame, repeated
+
+
+def _window_ratios(
+    np: Any,
+    diffs: Any,
+    expected_low: Any,
+    window_starts: Any
+) -> Any:
+    """Per window, the mean difference where the cadence expects little
+    change relative to the mean where it expects motion. NaN where the
+    window has no fields of either kind."""
+    measured = ~np.isnan(diffs)
+    diffs = np.where(measured, diffs, 0)
+    low = expected_low & measured
+    high = ~expected_low & measured
+    low_counts = np.add.reduceat(low.astype(np.int64), window_starts)
+    high_counts = np.add.reduceat(high.astype(np.int64), window_starts)
+    low_means = (
+        np.add.reduceat(np.where(low, diffs, 0), window_starts)
+        / np.maximum(low_counts, 1)
+    )
+    high_means = (
+        np.add.reduceat(np.where(high, diffs, 0), window_starts)
+        / np.maximum(high_counts, 1)
+    )
+    ratios = (low_means + _METRIC_EPSILON) / (high_means + _METRIC_EPSILON)
+    return np.where((low_counts > 0) & (high_counts > 0), ratios, np.nan)
+
+
+def _cadence_timeline(
+    window_cadences: Sequence[Optional[int]],
+    cadences: Sequence[Tuple[Union[str, PulldownPattern], int, int]],
+    window: int,
+    num_frames: int
+) -> FramePropTimeline:
+    """Joins consecutive windows sharing a cadence into runs. Undecided
+    windows join the run before them, or the run after them at the start of
+    the clip."""
+    run_cadences: List[Optional[int]] = []
+    run_starts: List[int] = []
+    for window_idx, cadence_idx in enumerate(window_cadences):
+        if cadence_idx is None or (
+            run_cadences and cadence_idx == run_cadences[-1]
+        ):
+            continue
+        run_cadences.append(cadence_idx)
+        # Leading undecided windows take the first cadence found.
+        run_starts.append(window_idx * window if run_starts else 0)
+    if not run_cadences:
+        run_cadences.append(None)
+        run_starts.append(0)
+
+    values: List[Optional[PulldownCadence]] = []
+    value_ids: List[int] = []
+    value_id_by_value: Dict[Optional[PulldownCadence], int] = {}
+    for start, cadence_idx in zip(run_starts, run_cadences):
+        if cadence_idx is None:
+            value = None
+        else:
+            pulldown_pattern, phase, frame_cycle_size = cadences[cadence_idx]
+            value = PulldownCadence(
+                pulldown_pattern,
+                (phase + start) % frame_cycle_size
+            )
+        if value not in value_id_by_value:
+            value_id_by_value[value] = len(values)
+            values.append(value)
+        value_ids.append(value_id_by_value[value])
+
+    return FramePropTimeline(
+        props=PulldownCadence._fields,
+        starts=run_starts,
+        ends=run_starts[1:] + [num_frames],
+        value_ids=value_ids,
+        values=values
+    )
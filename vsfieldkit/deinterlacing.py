@@ -5,7 +5,8 @@ from vapoursynth import FieldBased, VideoNode, core
 
 from vsfieldkit.kernels import resample_chroma_with_spline36
 from vsfieldkit.types import Resizer
-from vsfieldkit.util import convert_format_if_needed
+from vsfieldkit.util import (assume_bff, assume_tff, convert_format_if_needed,
+                             first_field_is_top, first_frame_props)
 from vsfieldkit.vapoursynth import VS_FIELD_FROM_BOTTOM, VS_FIELD_FROM_TOP
 
 
@@ -15,13 +16,18 @@ def bob(
     tff: Optional[bool] = None,
     keep_field_property: bool = True,
     kernel: Resizer = core.resize.Spline36,
-    dither_type: str = 'random'
+    dither_type: str = 'random',
+    field_order_from_props: bool = True
 ) -> VideoNode:
     """Returns a clip of progressive frames, each consisting of a field from
     the original interlaced clip in order of its original capture.
 
     As interlaced fields have half the resolution of a given moment, the new
     frames are stretched up to the original clip's height.
+
+    If field_order_from_props is False, every frame is assumed to share one
+    field order (tff, or else the first frame's) so that shifting can
+    alternate by frame number instead of inspecting every field.
     """
     if (
         shift
@@ -35,6 +41,10 @@ def bob(
              DeprecationWarning)
         stretched = clip.resize.Bob(filter=kernel_filter)
     else:
+        if not field_order_from_props:
+            if tff is None:
+                tff = first_field_is_top(first_frame_props(clip), tff)
+            clip = assume_tff(clip) if tff else assume_bff(clip)
         as_fields = clip.std.SeparateFields(tff=tff)
         stretched = convert_format_if_needed(
             as_fields,
@@ -63,14 +73,37 @@ def bob(
                 dither_type=dither_type,
                 src_top=-0.125
             )
-            shift_map = {
-                VS_FIELD_FROM_TOP: stretched_as_top,
-                VS_FIELD_FROM_BOTTOM: stretched_as_bottom
-            }
-            stretched = stretched.std.FrameEval(
-                lambda n, f: shift_map[f.props._Field],
-                prop_src=(as_fields,)
-            )
+            if field_order_from_props:
+                shift_map = {
+                    VS_FIELD_FROM_TOP: stretched_as_top,
+                    VS_FIELD_FROM_BOTTOM: stretched_as_bottom
+                }
+                stretched = stretched.std.FrameEval(
+                    lambda n, f: shift_map[f.props._Field],
+                    prop_src=(as_fields,)
+                )
+            else:
+                # Parity simply alternates, so fields can be picked from
+                # each shifted clip without looking at them.
+                if tff:
+                    first, second = stretched_as_top, stretched_as_bottom
+                else:
+                    first, second = stretched_as_bottom, stretched_as_top
+                stretched = core.std.Interleave(
+                    (
+                        first.std.SelectEvery(
+                            cycle=2,
+                            offsets=0,
+                            modify_duration=False
+                        ),
+                        second.std.SelectEvery(
+                            cycle=2,
+                            offsets=1,
+                            modify_duration=False
+                        )
+                    ),
+                    modify_duration=False
+                )
 
     if keep_field_property:
         return stretched
@@ -0,0 +1,626 @@
+import sys
+from collections import Counter
+from time import perf_counter
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Mapping,
+                    NamedTuple, Optional, Sequence, Set, Tuple, Union)
+
+from vapoursynth import ColorFamily, Error, VideoNode, core
+
+from vsfieldkit.util import FormatConversionPlan, _prefetched_frames
+
+# Output frames whose requests are followed to estimate per-frame costs. Long
+# enough to cover whole cycles of the common pulldown patterns.
+EXPLAIN_SAMPLE_FRAMES = 120
+
+# Filters that pass frames from their input through without allocating new
+# frame planes.
+FRAME_PASSING_FILTERS = frozenset((
+    'AssumeFPS',
+    'Cache',
+    'CopyFrameProps',
+    'FrameEval',
+    'Interleave',
+    'Loop',
+    'RemoveFrameProps',
+    'SelectEvery',
+    'SetFieldBased',
+    'SetFrameProp',
+    'SetFrameProps',
+    'ShufflePlanes',
+    'Splice',
+    'Trim',
+))
+
+PYTHON_CALLBACK_FILTERS = frozenset(('FrameEval', 'ModifyFrame'))
+
+
+class NodeProfile(NamedTuple):
+    filter: str
+    """Name of the VapourSynth function that created the node."""
+    function: Optional[str]
+    """vsfieldkit function called to build the graph the node belongs to, or
+    None if the node wasn't created by vsfieldkit."""
+    helper: Optional[str]
+    """Innermost vsfieldkit function or method that created the node."""
+    seconds: float
+    """Time the node spent producing frames, excluding its dependencies."""
+    frames: int
+    """Distinct frames of the node needed for the rendered sample."""
+    node: VideoNode
+
+
+class HelperProfile(NamedTuple):
+    function: Optional[str]
+    helper: Optional[str]
+    seconds: float
+    nodes: int
+
+
+class NodeSummary(NamedTuple):
+    filter: str
+    """Name of the VapourSynth function that created the node."""
+    function: Optional[str]
+    """vsfieldkit function called to build the graph the node belongs to, or
+    None if the node wasn't created by vsfieldkit."""
+    helper: Optional[str]
+    """Innermost vsfieldkit function or method that created the node."""
+    format: Optional[str]
+    width: int
+    height: int
+    node: VideoNode
+
+
+class FormatConversion(NamedTuple):
+    filter: str
+    """Resize kernel performing the conversion."""
+    function: Optional[str]
+    """vsfieldkit function the conversion was planned for."""
+    source_format: Optional[str]
+    source_width: int
+    source_height: int
+    format: Optional[str]
+    width: int
+    height: int
+
+
+class GraphExplanation:
+    """Structure and estimated cost of a graph, gathered without rendering
+    any of its frames. bytes_per_frame estimates the frame data newly
+    allocated across the graph for every output frame.
+    """
+
+    def __init__(
+        self,
+        nodes: Sequence[NodeSummary],
+        conversions: Sequence[FormatConversion],
+        bytes_per_frame: float
+    ):
+        self.nodes = tuple(nodes)
+        self.conversions = tuple(conversions)
+        self.bytes_per_frame = bytes_per_frame
+
+    @property
+    def filters(self) -> Mapping[str, int]:
+        """Number of nodes created by each VapourSynth function."""
+        return dict(Counter(node.filter for node in self.nodes))
+
+    @property
+    def callbacks(self) -> Sequence[NodeSummary]:
+        """Nodes that run Python for every frame they produce."""
+        return tuple(
+            node
+            for node in self.nodes
+            if node.filter in PYTHON_CALLBACK_FILTERS
+        )
+
+    @property
+    def formats(self) -> Mapping[Tuple[Optional[str], int, int], int]:
+        """Number of nodes producing each (format, width, height)."""
+        return dict(Counter(
+            (node.format, node.width, node.height)
+            for node in self.nodes
+        ))
+
+
+class NodeTrace(NamedTuple):
+    filter: str
+    """Name of the VapourSynth function that created the node."""
+    function: Optional[str]
+    """vsfieldkit function called to build the graph the node belongs to, or
+    None if the node wasn't created by vsfieldkit."""
+    helper: Optional[str]
+    """Innermost vsfieldkit function or method that created the node."""
+    requested: Mapping[Tuple[VideoNode, int], int]
+    """Number of times the node requested each (dependency, frame number)."""
+    produced: int
+    """Distinct frames the node produced."""
+    requests: int
+    """Times frames of the node were requested by nodes depending on it."""
+    reuse_distances: Sequence[int]
+    """For every repeated request of one of the node's frames, how many other
+    distinct frames of the node were requested since that frame was last
+    requested."""
+    node: VideoNode
+
+    @property
+    def fan_out(self) -> float:
+        """Frames requested from dependencies per frame produced."""
+        if not self.produced:
+            return 0.0
+        return sum(self.requested.values()) / self.produced
+
+    @property
+    def max_reuse_distance(self) -> Optional[int]:
+        """Frames the node would need to cache so that no frame is produced
+        twice, minus one. None if no frame was requested twice."""
+        return max(self.reuse_distances, default=None)
+
+
+class FrameRequestTrace:
+    """Frame requests between the nodes of a graph while producing a range of
+    its output frames, assuming every node caches the frames it produces."""
+
+    def __init__(self, nodes: Sequence[NodeTrace], frames: int):
+        self.nodes = tuple(nodes)
+        self.frames = frames
+
+    @property
+    def cache_bytes(self) -> int:
+        """Frame data that has to stay cached across the graph so that every
+        repeated request is a cache hit. Nodes that pass their input's frames
+        through share memory with their input and aren't counted."""
+        return sum(
+            (trace.max_reuse_distance + 1) * _frame_bytes(trace.node)
+            for trace in self.nodes
+            if trace.max_reuse_distance is not None
+            and trace.filter not in FRAME_PASSING_FILTERS
+        )
+
+
+class GraphProfile:
+    """Per-node timings of a rendered sample of a clip, slowest node first."""
+
+    def __init__(
+        self,
+        nodes: Sequence[NodeProfile],
+        frames: int,
+        render_seconds: float
+    ):
+        self.nodes = tuple(
+            sorted(nodes, key=lambda node: node.seconds, reverse=True)
+        )
+        self.frames = frames
+        self.render_seconds = render_seconds
+
+    def by_helper(self) -> Sequence[HelperProfile]:
+        """Node timings summed per vsfieldkit function and helper, slowest
+        helper first."""
+        totals: Dict[
+            Tuple[Optional[str], Optional[str]],
+            Tuple[float, int]
+        ] = {}
+        for node in self.nodes:
+            key = (node.function, node.helper)
+            seconds, count = totals.get(key, (0.0, 0))
+            totals[key] = (seconds + node.seconds, count + 1)
+        helpers = [
+            HelperProfile(function, helper, seconds, count)
+            for (function, helper), (seconds, count) in totals.items()
+        ]
+        return sorted(helpers, key=lambda helper: helper.seconds,
+                      reverse=True)
+
+
+def profile(
+    clip: Union[VideoNode, Callable[[], VideoNode]],
+    frames: Union[int, Sequence[int]] = 100,
+    prefetch: int = 0
+) -> GraphProfile:
+    """Renders a sample of the clip with VapourSynth's node timing enabled
+    and reports how long each node in its graph took. If a function building
+    the clip is passed instead of the clip, each node is also attributed to
+    the vsfieldkit function and internal helper that created it.
+
+    Requires a core created with graph inspection enabled."""
+    origins: Mapping[VideoNode, Tuple[str, str]]
+    if isinstance(clip, VideoNode):
+        _require_graph_inspection(clip)
+        origins = {}
+    else:
+        clip, origins = _build_with_origins(clip)
+
+    if isinstance(frames, int):
+        frames = range(min(frames, len(clip)))
+    nodes = _graph_nodes(clip)
+    frames_needed = _frames_needed(nodes, frames)
+
+    timings = core.timings
+    timings_were_enabled = timings.enabled
+    timings.enabled = True
+    try:
+        for node in nodes:
+            # Frames cached by earlier renders would hide their cost.
+            node.clear_cache()
+            node.timings = 0
+        render_start = perf_counter()
+        for _frame in _prefetched_frames(clip, prefetch, frames):
+            pass
+        render_seconds = perf_counter() - render_start
+        node_timings = [node.timings for node in nodes]
+    finally:
+        timings.enabled = timings_were_enabled
+
+    node_profiles = []
+    for node, nanoseconds in zip(nodes, node_timings):
+        function, helper = origins.get(node, (None, None))
+        node_profiles.append(NodeProfile(
+            filter=node._name,
+            function=function,
+            helper=helper,
+            seconds=nanoseconds / 1e9,
+            frames=len(frames_needed[node]),
+            node=node
+        ))
+    return GraphProfile(
+        nodes=node_profiles,
+        frames=len(frames),
+        render_seconds=render_seconds
+    )
+
+
+def explain(
+    fn: Callable[..., VideoNode],
+    clip: VideoNode,
+    **kwargs: Any
+) -> GraphExplanation:
+    """Builds the graph of fn(clip, **kwargs) without rendering its output
+    and describes its nodes, the format conversions chosen for it and an
+    estimate of the frame data it allocates per output frame.
+
+    Requires a core created with graph inspection enabled."""
+    explained, origins = _build_with_origins(lambda: fn(clip, **kwargs))
+    nodes = _graph_nodes(explained)
+
+    node_summaries = []
+    conversions = []
+    for node in nodes:
+        function, helper = origins.get(node, (None, None))
+        node_summaries.append(NodeSummary(
+            filter=node._name,
+            function=function,
+            helper=helper,
+            format=_format_name(node),
+            width=node.width,
+            height=node.height,
+            node=node
+        ))
+        if helper == f'{FormatConversionPlan.__name__}._realize':
+            source = node.dependencies[0]
+            conversions.append(FormatConversion(
+                filter=node._name,
+                function=function,
+                source_format=_format_name(source),
+                source_width=source.width,
+                source_height=source.height,
+                format=_format_name(node),
+                width=node.width,
+                height=node.height
+            ))
+    # Graph order lists consumers first, conversions read better in the order
+    # frames pass through them.
+    conversions.reverse()
+
+    sample = range(min(EXPLAIN_SAMPLE_FRAMES, len(explained)))
+    frames_needed = _frames_needed(nodes, sample)
+    allocated_bytes = sum(
+        len(frames_needed[node]) * _frame_bytes(node)
+        for node in nodes
+        if node._name not in FRAME_PASSING_FILTERS
+    )
+    return GraphExplanation(
+        nodes=node_summaries,
+        conversions=conversions,
+        bytes_per_frame=allocated_bytes / len(sample) if sample else 0.0
+    )
+
+
+def trace_frame_requests(
+    clip: Union[VideoNode, Callable[[], VideoNode]],
+    frames: Union[int, Sequence[int]] = 100
+) -> FrameRequestTrace:
+    """Follows the frame requests every node of the clip's graph makes while
+    the given output frames are produced in order, without rendering them.
+    As with profile, passing a function building the clip attributes nodes to
+    the vsfieldkit function and helper that created them.
+
+    Requires a core created with graph inspection enabled."""
+    origins: Mapping[VideoNode, Tuple[str, str]]
+    if isinstance(clip, VideoNode):
+        _require_graph_inspection(clip)
+        origins = {}
+    else:
+        clip, origins = _build_with_origins(clip)
+    if isinstance(frames, int):
+        frames = range(min(frames, len(clip)))
+    nodes = _graph_nodes(clip)
+
+    requested: Dict[VideoNode, Counter] = {node: Counter() for node in nodes}
+    request_order: Dict[VideoNode, List[int]] = {node: [] for node in nodes}
+    produced: Dict[VideoNode, Set[int]] = {node: set() for node in nodes}
+    for output_n in frames:
+        pending = [(clip, output_n)]
+        while pending:
+            node, n = pending.pop()
+            request_order[node].append(n)
+            if n in produced[node]:
+                continue
+            produced[node].add(n)
+            dependency_requests = list(_requested_frames(node, n))
+            requested[node].update(dependency_requests)
+            # Reversed, so that the stack pops them in the order requested.
+            pending.extend(reversed(dependency_requests))
+
+    node_traces = []
+    for node in nodes:
+        function, helper = origins.get(node, (None, None))
+        node_traces.append(NodeTrace(
+            filter=node._name,
+            function=function,
+            helper=helper,
+            requested=dict(requested[node]),
+            produced=len(produced[node]),
+            requests=len(request_order[node]),
+            reuse_distances=_reuse_distances(request_order[node]),
+            node=node
+        ))
+    return FrameRequestTrace(nodes=node_traces, frames=len(frames))
+
+
+def _reuse_distances(requests: Sequence[int]) -> Sequence[int]:
+    """Least-recently-used stack distances of repeated requests."""
+    # The distance of a repeat is how many distinct frames were requested
+    # since the frame's previous request. A Fenwick tree over request
+    # positions marks the latest request of each frame so that count takes
+    # O(log n) rather than a scan of the whole LRU stack.
+    tree = [0] * (len(requests) + 1)
+
+    def mark(position: int, delta: int) -> None:
+        position += 1
+        while position < len(tree):
+            tree[position] += delta
+            position += position & -position
+
+    def marked_before(position: int) -> int:
+        total = 0
+        while position > 0:
+            total += tree[position]
+            position -= position & -position
+        return total
+
+    distances = []
+    last_positions: Dict[int, int] = {}
+    for position, n in enumerate(requests):
+        last_position = last_positions.get(n)
+        if last_position is not None:
+            distances.append(
+                marked_before(position) - marked_before(last_position + 1)
+            )
+            mark(last_position, -1)
+        mark(position, 1)
+        last_positions[n] = position
+    return distances
+
+
+def _build_with_origins(
+    build: Callable[[], VideoNode]
+) -> Tuple[VideoNode, Mapping[VideoNode, Tuple[str, str]]]:
+    with _NodeOriginRecorder() as recorder:
+        clip = build()
+    _require_graph_inspection(clip)
+    return clip, recorder.origins()
+
+
+def _format_name(clip: VideoNode) -> Optional[str]:
+    return clip.format.name if clip.format else None
+
+
+def _frame_bytes(clip: VideoNode) -> int:
+    """Size of the planes of one of the clip's frames."""
+    format = clip.format
+    if not format:
+        return 0
+    plane_size = clip.width * clip.height * format.bytes_per_sample
+    if format.color_family == ColorFamily.YUV and format.num_planes > 1:
+        chroma_size = plane_size >> (
+            format.subsampling_w + format.subsampling_h
+        )
+        return plane_size + chroma_size * (format.num_planes - 1)
+    return plane_size * format.num_planes
+
+
+def _require_graph_inspection(clip: VideoNode) -> None:
+    if (
+        not hasattr(clip, 'dependencies')
+        or not hasattr(core, 'timings')
+        or not clip.is_inspectable(0)
+    ):
+        raise Error(
+            'Inspecting graphs requires VapourSynth R65 or newer with a core '
+            'created with graph inspection enabled '
+            '(CoreCreationFlags.ENABLE_GRAPH_INSPECTION).'
+        )
+
+
+class _Call(NamedTuple):
+    function: str
+    helper: str
+    inputs: Tuple[VideoNode, ...]
+    outputs: Tuple[VideoNode, ...]
+
+
+class _NodeOriginRecorder:
+    """Notes the nodes each vsfieldkit function call received and returned
+    while a graph is built. Nodes reachable from a call's outputs but not
+    from its inputs were created by that call or the calls it made."""
+
+    def __init__(self):
+        self.calls: List[_Call] = []
+        self._stack: List[Tuple[str, Tuple[VideoNode, ...]]] = []
+        self._previous_profiler = None
+
+    def __enter__(self) -> '_NodeOriginRecorder':
+        self._previous_profiler = sys.getprofile()
+        sys.setprofile(self._on_event)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        sys.setprofile(self._previous_profiler)
+
+    def _on_event(self, frame, event: str, arg) -> None:
+        if event not in ('call', 'return'):
+            return
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith('vsfieldkit.') or module == __name__:
+            return
+        if event == 'call':
+            self._stack.append((
+                _function_name(frame),
+                tuple(_nodes_in(frame.f_locals.values()))
+            ))
+        elif self._stack:
+            helper, inputs = self._stack.pop()
+            outputs = tuple(_nodes_in((arg,)))
+            if outputs:
+                function = self._stack[0][0] if self._stack else helper
+                self.calls.append(_Call(function, helper, inputs, outputs))
+
+    def origins(self) -> Mapping[VideoNode, Tuple[str, str]]:
+        """The (function, helper) that created each recorded node."""
+        origins: Dict[VideoNode, Tuple[str, str]] = {}
+        # Calls are recorded as they return, so nested helpers claim their
+        # nodes before the functions that called them.
+        for call in self.calls:
+            inputs = set(call.inputs)
+            visited = set()
+            pending = list(call.outputs)
+            while pending:
+                node = pending.pop()
+                if node in visited or node in inputs:
+                    continue
+                visited.add(node)
+                origins.setdefault(node, (call.function, call.helper))
+                pending.extend(node.dependencies)
+        return origins
+
+
+def _function_name(frame) -> str:
+    code = frame.f_code
+    qualname = getattr(code, 'co_qualname', None)
+    if qualname:
+        return qualname
+    if 'self' in frame.f_locals:
+        return f'{type(frame.f_locals["self"]).__name__}.{code.co_name}'
+    return code.co_name
+
+
+def _nodes_in(values: Iterable, depth: int = 2) -> Iterator[VideoNode]:
+    for value in values:
+        if isinstance(value, VideoNode):
+            yield value
+        elif isinstance(value, FormatConversionPlan):
+            yield value.clip
+        elif depth and isinstance(value, (tuple, list)):
+            yield from _nodes_in(value, depth - 1)
+        elif depth and isinstance(value, dict):
+            yield from _nodes_in(value.values(), depth - 1)
+
+
+def _graph_nodes(clip: VideoNode) -> List[VideoNode]:
+    """Every node of the clip's graph, each listed before the nodes it
+    depends on."""
+    visited = set()
+    finished = []
+    pending = [(clip, False)]
+    while pending:
+        node, dependencies_finished = pending.pop()
+        if dependencies_finished:
+            finished.append(node)
+            continue
+        if node in visited:
+            continue
+        visited.add(node)
+        pending.append((node, True))
+        pending.extend(
+            (dependency, False)
+            for dependency in node.dependencies
+            if dependency not in visited
+        )
+    finished.reverse()
+    return finished
+
+
+def _frames_needed(
+    nodes: Sequence[VideoNode],
+    frames: Iterable[int]
+) -> Mapping[VideoNode, Set[int]]:
+    """Frame numbers of each node that rendering the given frames of the
+    first node requests, assuming every node caches its frames."""
+    needed: Dict[VideoNode, Set[int]] = {node: set() for node in nodes}
+    needed[nodes[0]].update(frames)
+    for node in nodes:
+        for n in needed[node]:
+            for dependency, dependency_n in _requested_frames(node, n):
+                needed.setdefault(dependency, set()).add(dependency_n)
+    return needed
+
+
+def _requested_frames(
+    node: VideoNode,
+    n: int
+) -> Iterator[Tuple[VideoNode, int]]:
+    """Frames a node requests from its dependencies to produce frame n.
+    Filters that rearrange frames are modelled exactly; any other filter is
+    assumed to request the frame at the same position in each dependency."""
+    filter_name = node._name
+    inputs = node._inputs
+    if filter_name == 'SelectEvery':
+        clip = inputs['clip']
+        offsets = inputs['offsets']
+        if isinstance(offsets, int):
+            offsets = (offsets,)
+        cycle_n, offset_idx = divmod(n, len(offsets))
+        yield clip, _clamped(cycle_n * inputs['cycle'] + offsets[offset_idx],
+                             clip)
+    elif filter_name == 'Trim':
+        clip = inputs['clip']
+        yield clip, _clamped(n + inputs.get('first', 0), clip)
+    elif filter_name == 'Splice':
+        for clip in inputs['clips']:
+            if n < len(clip):
+                yield clip, n
+                return
+            n -= len(clip)
+    elif filter_name == 'Interleave':
+        clips = inputs['clips']
+        cycle_n, clip_idx = divmod(n, len(clips))
+        yield clips[clip_idx], _clamped(cycle_n, clips[clip_idx])
+    elif filter_name == 'Loop':
+        clip = inputs['clip']
+        yield clip, n % len(clip)
+    elif filter_name == 'SeparateFields':
+        yield inputs['clip'], n // 2
+    elif filter_name == 'DoubleWeave':
+        clip = inputs['clip']
+        yield clip, _clamped(n, clip)
+        yield clip, _clamped(n + 1, clip)
+    else:
+        num_frames = len(node)
+        for dependency in node.dependencies:
+            yield dependency, _clamped(
+                n * len(dependency) // num_frames,
+                dependency
+            )
+
+
+def _clamped(n: int, clip: VideoNode) -> int:
+    return min(n, len(clip) - 1)
@@ -1,13 +1,13 @@
 from fractions import Fraction
 from itertools import cycle, islice
 from math import ceil, floor
-from typing import Optional, Sequence, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-from vapoursynth import VideoFrame, VideoNode, core
+from vapoursynth import VideoNode, core
 
 from vsfieldkit.kernels import resample_chroma_with_spline36
 from vsfieldkit.types import PulldownPattern, Resizer
-from vsfieldkit.util import convert_format_if_needed
+from vsfieldkit.util import assume_progressive, convert_format_if_needed
 
 
 def telecine(
@@ -83,6 +83,96 @@ def telecine(
     return interlaced
 
 
+def detelecine(
+    clip: VideoNode,
+    pulldown_pattern: Union[str, PulldownPattern],
+    *,
+    tff: bool,
+    phase: int = 0
+) -> VideoNode:
+    """Reverses :py:func:`vsfieldkit.telecine` for a clip with a known,
+    unbroken pulldown pattern by re-pairing each original frame's fields.
+    """
+    pattern_parts = _pulldown_pattern_parts(pulldown_pattern)
+    offsets_pattern = _pulldown_pattern_to_field_offsets(pattern_parts)
+    field_cycle_size = len(offsets_pattern)
+    if not 0 <= phase < field_cycle_size // 2:
+        raise ValueError(
+            f'phase must be at least 0 and less than the '
+            f'{field_cycle_size // 2} frames in the pulldown cycle.'
+        )
+    field_offsets = _pulldown_field_sources(offsets_pattern)
+    # Fields repeated within the cycle might only be in the clip as a later
+    # copy when the clip starts part way into the cycle.
+    first_cycle_field_offsets = _pulldown_field_sources(
+        offsets_pattern,
+        min_position=phase * 2
+    )
+
+    # Pad so that both the start and end of the clip land on whole cycles.
+    num_fields = (phase + len(clip)) * 2
+    num_cycles = ceil(num_fields / field_cycle_size)
+    padding_after = (num_cycles * field_cycle_size - num_fields) // 2
+    padded = clip
+    if phase:
+        padded = clip[0] * phase + padded
+    if padding_after:
+        padded = padded + clip[-1] * padding_after
+
+    as_fields = padded.std.SeparateFields(tff=tff)
+    frames_per_cycle = len(field_offsets) // 2
+    progressive = _weave_pulldown_field_sources(
+        as_fields,
+        field_cycle_size,
+        field_offsets
+    )
+    if first_cycle_field_offsets != field_offsets:
+        first_cycle = _weave_pulldown_field_sources(
+            as_fields[:field_cycle_size],
+            field_cycle_size,
+            first_cycle_field_offsets
+        )
+        if num_cycles > 1:
+            progressive = first_cycle + progressive[frames_per_cycle:]
+        else:
+            progressive = first_cycle
+
+    # Only keep frames that had both of their fields in the clip.
+    first_frame = sum(
+        1 for frame_idx in range(frames_per_cycle)
+        if min(first_cycle_field_offsets[frame_idx * 2:frame_idx * 2 + 2])
+        < phase * 2
+    )
+    last_cycle_start = (num_cycles - 1) * field_cycle_size
+    last_cycle_field_offsets = (
+        field_offsets if num_cycles > 1 else first_cycle_field_offsets
+    )
+    end_frame = (num_cycles - 1) * frames_per_cycle + sum(
+        1 for frame_idx in range(frames_per_cycle)
+        if last_cycle_start + max(
+            last_cycle_field_offsets[frame_idx * 2:frame_idx * 2 + 2]
+        ) < num_fields
+    )
+    if first_frame >= end_frame:
+        raise ValueError(
+            'The clip is too short to hold both fields of any original '
+            'frame.'
+        )
+    return progressive[first_frame:end_frame]
+
+
+def _weave_pulldown_field_sources(
+    fields: VideoNode,
+    field_cycle_size: int,
+    field_sources: Sequence[int]
+) -> VideoNode:
+    original_fields = fields.std.SelectEvery(
+        cycle=field_cycle_size,
+        offsets=field_sources
+    )
+    return assume_progressive(weave_fields(original_fields))
+
+
 def weave_fields(
     clip: VideoNode
 ) -> VideoNode:
@@ -92,6 +182,24 @@ def weave_fields(
     return clip.std.DoubleWeave()[::2]
 
 
+def _pulldown_pattern_parts(
+    pulldown_pattern: Union[str, PulldownPattern]
+) -> List[int]:
+    if isinstance(pulldown_pattern, PulldownPattern):
+        pulldown_pattern = pulldown_pattern.value
+    pattern_parts = [
+        int(field_duration)
+        for field_duration
+        in pulldown_pattern.split(':')
+    ]
+    pattern_duration = sum(pattern_parts)
+    if pattern_duration % 2 != 0:
+        # Abbreviated pattern.
+        # Run twice, so we don't end on half a frame.
+        pattern_parts *= 2
+    return pattern_parts
+
+
 def _pulldown_pattern_to_field_offsets(
     pattern: Sequence[int]
 ) -> Sequence[int]:
@@ -111,6 +219,36 @@ def _pulldown_pattern_to_field_offsets(
     return offsets_pattern
 
 
+def _pulldown_field_sources(
+    offsets_pattern: Sequence[int],
+    min_position: int = 0
+) -> List[int]:
+    """Inverts a cycle of pulled down field offsets, giving the position of
+    the first and second field of each original frame within the cycle.
+    Where a field was repeated, the earliest copy at or after min_position
+    is used, falling back to the earliest copy. Raises ValueError if an
+    original frame was only given fields of one parity."""
+    field_positions: Dict[int, int] = {}
+    for position, field_offset in enumerate(offsets_pattern):
+        known_position = field_positions.get(field_offset)
+        if known_position is None or (
+            known_position < min_position <= position
+        ):
+            field_positions[field_offset] = position
+
+    field_sources: List[int] = []
+    for frame_idx in sorted({offset // 2 for offset in offsets_pattern}):
+        first_field = field_positions.get(frame_idx * 2)
+        second_field = field_positions.get(frame_idx * 2 + 1)
+        if first_field is None or second_field is None:
+            raise ValueError(
+                f'Original frame {frame_idx} of the pulldown cycle only has '
+                f'fields of one parity, so it cannot be restored.'
+            )
+        field_sources.extend((first_field, second_field))
+    return field_sources
+
+
 def _telecine_by_pattern(
     clip: VideoNode,
     upsampled_clip: VideoNode,
@@ -121,18 +259,7 @@ def _telecine_by_pattern(
     interlace_progressive_chroma: bool,
     tff: bool
 ) -> VideoNode:
-    if isinstance(pulldown_pattern, PulldownPattern):
-        pulldown_pattern = pulldown_pattern.value
-    pattern_parts = [
-        int(field_duration)
-        for field_duration
-        in pulldown_pattern.split(':')
-    ]
-    pattern_duration = sum(pattern_parts)
-    if pattern_duration % 2 != 0:
-        # Abbreviated pattern.
-        # Run twice, so we don't end on half a frame.
-        pattern_parts *= 2
+    pattern_parts = _pulldown_pattern_parts(pulldown_pattern)
     orig_cycle_size = len(pattern_parts)
     offsets_pattern = _pulldown_pattern_to_field_offsets(pattern_parts)
 
@@ -156,44 +283,121 @@ def _telecine_by_pattern(
 
     if not interlace_progressive_chroma:
         # Restore original progressive frames but with interlaced metadata
-        # First create a map of clean frames in new cycle pointing to
-        # original frames in source cycle
-        clean_frame_sources = {}
-        for field_idx in range(0, len(offsets_pattern), 2):
-            field_offset_1, field_offset_2 = (
-                offsets_pattern[field_idx:field_idx + 2]
-            )
-            if (
-                (field_offset_2 == field_offset_1 + 1)
-                and field_offset_1 % 2 == 0
-            ):
-                clean_frame_sources[field_idx // 2] = (
-                        field_offset_1 // 2
-                )
-        frame_cycle_size = len(offsets_pattern) // 2
-
-        def restore_original_frames(n: int, f: VideoFrame):
-            cycle_idx = floor(n // frame_cycle_size)
-            frame_idx_in_cycle = n % frame_cycle_size
-            if frame_idx_in_cycle in clean_frame_sources:
-                orig_frame_offset = clean_frame_sources[frame_idx_in_cycle]
-                orig_frame_num = (
-                    (cycle_idx * orig_cycle_size)
-                    + orig_frame_offset
-                )
-                orig_frame = clip.get_frame(orig_frame_num)
-                fake_interlaced_frame = orig_frame.copy()
-                fake_interlaced_frame.props = dict(f.props)
-                return fake_interlaced_frame
-            return f
-
-        interlaced = interlaced.std.ModifyFrame(
-            clips=(interlaced,),
-            selector=restore_original_frames
+        # wherever both fields of a new frame came from the same original
+        # frame.
+        interlaced = _restore_clean_frames(
+            interlaced,
+            clip,
+            orig_cycle_size=orig_cycle_size,
+            clean_frame_sources=_clean_frame_sources(offsets_pattern)
         )
     return interlaced
 
 
+def _time_field_offsets(field_ratio: Fraction) -> Tuple[int, List[int]]:
+    """Maps each new field n to the field of the same parity from the
+    original frame showing at the new field's start time, original frame
+    floor(n * field_ratio). The mapping repeats every time the new fields and
+    original frames line up again, so only one cycle of offsets is returned
+    along with the number of original frames that cycle spans."""
+    cycle_fields = field_ratio.denominator
+    if cycle_fields % 2:
+        # Keep field parity aligned between cycles.
+        cycle_fields *= 2
+    cycle_frames = int(cycle_fields * field_ratio)
+    offsets = [
+        (floor(n * field_ratio) * 2) + (n % 2)
+        for n in range(cycle_fields)
+    ]
+    return cycle_frames, offsets
+
+
+def _select_fields_by_time(
+    original_fields: VideoNode,
+    cycle_frames: int,
+    offsets: Sequence[int],
+    num_fields: int
+) -> VideoNode:
+    # Whole cycles are needed to select from, so the last original frame
+    # stands in for any frames the new fields outlast.
+    num_cycles = ceil(num_fields / len(offsets))
+    missing_frames = (num_cycles * cycle_frames) - (len(original_fields) // 2)
+    if missing_frames > 0:
+        original_fields = (
+            original_fields
+            + original_fields[-2:] * missing_frames
+        )
+    selected = original_fields.std.SelectEvery(
+        cycle=cycle_frames * 2,
+        offsets=offsets,
+        modify_duration=False
+    )
+    return selected[:num_fields]
+
+
+def _clean_frame_sources(
+    field_offsets: Sequence[int]
+) -> List[Optional[int]]:
+    """For each frame woven from a cycle of field offsets, the offset of the
+    original frame both of its fields came from, or None where the fields
+    came from different frames."""
+    clean_frame_sources: List[Optional[int]] = []
+    for field_idx in range(0, len(field_offsets), 2):
+        field_offset_1, field_offset_2 = (
+            field_offsets[field_idx:field_idx + 2]
+        )
+        if (
+            (field_offset_2 == field_offset_1 + 1)
+            and field_offset_1 % 2 == 0
+        ):
+            clean_frame_sources.append(field_offset_1 // 2)
+        else:
+            clean_frame_sources.append(None)
+    return clean_frame_sources
+
+
+def _restore_clean_frames(
+    interlaced: VideoNode,
+    clip: VideoNode,
+    orig_cycle_size: int,
+    clean_frame_sources: Sequence[Optional[int]]
+) -> VideoNode:
+    """Swaps in the original frames listed in clean_frame_sources, keeping
+    the interlaced frames' properties. Selection is done by native filters so
+    original frames are requested like any other input instead of being
+    fetched from within a frame callback."""
+    if all(source is None for source in clean_frame_sources):
+        return interlaced
+    frame_cycle_size = len(clean_frame_sources)
+
+    num_cycles = ceil(len(interlaced) / frame_cycle_size)
+    missing_frames = (num_cycles * orig_cycle_size) - len(clip)
+    if missing_frames > 0:
+        clip = clip + clip[-1] * missing_frames
+    # Frames that aren't clean are never requested from this clip, so any
+    # offset will do for them.
+    restored = clip.std.SelectEvery(
+        cycle=orig_cycle_size,
+        offsets=[source or 0 for source in clean_frame_sources],
+        modify_duration=False
+    )[:len(interlaced)]
+    restored = restored.std.AssumeFPS(interlaced)
+    restored = restored.std.CopyFrameProps(interlaced)
+
+    candidates = core.std.Interleave(
+        (interlaced, restored),
+        modify_duration=False
+    )
+    return candidates.std.SelectEvery(
+        cycle=frame_cycle_size * 2,
+        offsets=[
+            (frame_idx * 2) + int(source is not None)
+            for frame_idx, source in enumerate(clean_frame_sources)
+        ],
+        modify_duration=False
+    )[:len(interlaced)]
+
+
 def _telecine_by_time(
     clip: VideoNode,
     upsampled_clip: VideoNode,
@@ -209,36 +413,21 @@ def _telecine_by_time(
     original_duration = Fraction(original_length, clip.fps)
     original_fields = upsampled_clip.std.SeparateFields(tff=tff)
     new_length = ceil(fps * original_duration)
-    new_clip = upsampled_clip.std.BlankClip(
-        length=new_length,
-        fpsnum=fps.numerator,
-        fpsden=fps.denominator
+    new_field_rate = fps * 2
+    orig_cycle_size, field_offsets = _time_field_offsets(
+        original_fps / new_field_rate
     )
-    new_fields = new_clip.std.SeparateFields(tff=tff)
-    new_field_rate = new_fields.fps
-
-    def select_original_frame_field(n: int, f: VideoFrame):
-        time_at_new_start = Fraction(n, new_field_rate)
-        orig_frame_num = floor(time_at_new_start * original_fps)
-        orig_field_num = (orig_frame_num * 2) + (n % 2)
-        orig_field_frame = original_fields.get_frame(orig_field_num)
-
-        new_field_frame = orig_field_frame.copy()
-        new_field_frame.props['_DurationNum'] = f.props['_DurationNum']
-        new_field_frame.props['_DurationDen'] = f.props['_DurationDen']
-        return new_field_frame
-
-    new_fields = new_fields.std.ModifyFrame(
-        selector=select_original_frame_field,
-        clips=(new_fields,)
+    new_fields = _select_fields_by_time(
+        original_fields,
+        cycle_frames=orig_cycle_size,
+        offsets=field_offsets,
+        num_fields=new_length * 2
+    ).std.AssumeFPS(
+        fpsnum=new_field_rate.numerator,
+        fpsden=new_field_rate.denominator
     )
 
     interlaced = weave_fields(new_fields)
-    interlaced = convert_format_if_needed(
-        interlaced,
-        format=clip.format,
-        kernel=subsampling_kernel
-    )
 
     # Resample our upsampled fields if required:
     if pre_subsample_fields:
@@ -252,21 +441,11 @@ def _telecine_by_time(
         )
 
     if not interlace_progressive_chroma:
-        def restore_original_frames(n: int, f: VideoFrame):
-            time_at_1st_field = Fraction(n, fps)
-            time_at_2nd_field = time_at_1st_field + Fraction(1, new_field_rate)
-            orig_1st_field_frame_n = floor(time_at_1st_field * original_fps)
-            orig_2nd_field_frame_n = floor(time_at_2nd_field * original_fps)
-            if orig_1st_field_frame_n == orig_2nd_field_frame_n:
-                orig_frame: VideoFrame = clip.get_frame(orig_1st_field_frame_n)
-                fake_interlaced_frame = orig_frame.copy()
-                fake_interlaced_frame.props = dict(f.props)
-                return fake_interlaced_frame
-            return f
-
-        interlaced = interlaced.std.ModifyFrame(
-            clips=(interlaced,),
-            selector=restore_original_frames
+        interlaced = _restore_clean_frames(
+            interlaced,
+            clip,
+            orig_cycle_size=orig_cycle_size,
+            clean_frame_sources=_clean_frame_sources(field_offsets)
         )
 
     return interlaced
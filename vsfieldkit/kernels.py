@@ -9,8 +9,8 @@ except ImportError:
 
 from vsfieldkit.types import Resizer
 from vsfieldkit.util import (annotate_bobbed_fields, convert_format_if_needed,
-                             format_from_specifier, require_one_of,
-                             shift_chroma_to_luma_sited)
+                             first_frame_props, format_from_specifier,
+                             require_one_of, shift_chroma_to_luma_sited)
 
 resize = core.resize
 resample_nearest_neighbor = resize.Point
@@ -149,7 +149,11 @@ def prepare_nnedi3_chroma_upsampler(
             upsampled,
             tff=True,
             kernel=fallback_kernel,
-            dither_type=resize_kwargs.get('dither_type')
+            dither_type=resize_kwargs.get('dither_type'),
+            # The chroma was re-woven top field first above and keeps the
+            # source's _ChromaLocation, so it needn't be read per frame.
+            props_from_first_frame=True,
+            known_props=first_frame_props(clip)
         )
         return chromaloc_corrected
 
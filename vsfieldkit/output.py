@@ -1,9 +1,11 @@
 import sys
-from typing import IO, Callable, Mapping, Optional
+from typing import IO, Any, Callable, Mapping, Optional
 
 from vapoursynth import (ChromaLocation, ColorFamily, ColorRange, FieldBased,
                          SampleType, VideoFormat, VideoNode)
 
+from vsfieldkit.util import first_frame_props
+
 Y4M_FLOAT_DEPTH_CODES = {
     16: 'h',
     32: 's',
@@ -36,7 +38,8 @@ def output_frame_inferred_y4m(
     fileobj: IO,
     progress_update: Optional[Callable] = None,
     prefetch: int = 0,
-    backlog: int = -1
+    backlog: int = -1,
+    known_props: Optional[Mapping[str, Any]] = None
 ) -> None:
     """Similar to VideNode.output, writes raw video data to the given file
     object, decorated with yuv4mpeg2 headers based on the clip and the first
@@ -48,7 +51,7 @@ def output_frame_inferred_y4m(
         write = fileobj.buffer.write
     else:
         write = fileobj.write
-    y4m_header = yuv4mpeg2_header(clip)
+    y4m_header = yuv4mpeg2_header(clip, known_props=known_props)
     write(y4m_header)
     write(b'\n')
     if progress_update:
@@ -68,30 +71,36 @@ def output_frame_inferred_y4m(
     )
 
 
-def yuv4mpeg2_header(clip: VideoNode, infer_from_first_frame=True) -> bytes:
+def yuv4mpeg2_header(
+    clip: VideoNode,
+    infer_from_first_frame=True,
+    known_props: Optional[Mapping[str, Any]] = None
+) -> bytes:
     """Produces a YUV4MPEG2 header for the video clip. Unlike vspipe's
     out-of-the-box Y4M header, this one infers full details from the first
-    frame of the clip, not just the clip's dimensions.
+    frame of the clip, not just the clip's dimensions. If the first frame's
+    properties are already known, they can be passed in as known_props to
+    avoid rendering it.
     """
     # Defaults that can be overridden by frame metadata:
     interlacing = '?'
     sar = '0:0'
     color_range_code = None
     if infer_from_first_frame:
-        first_frame_props = clip.get_frame(0).props
+        first_props = first_frame_props(clip, known_props)
         interlacing = {
             FieldBased.FIELD_PROGRESSIVE: 'p',
             FieldBased.FIELD_TOP: 't',
             FieldBased.FIELD_BOTTOM: 'b'
-        }.get(first_frame_props.get('_FieldBased'), '?')
-        if '_SARNum' in first_frame_props:
+        }.get(first_props.get('_FieldBased'), '?')
+        if '_SARNum' in first_props:
             sar = (
-                f'{first_frame_props["_SARNum"]}'
-                f':{first_frame_props.get("_SARDen", 1)}'
+                f'{first_props["_SARNum"]}'
+                f':{first_props.get("_SARDen", 1)}'
             )
-        if '_ColorRange' in first_frame_props:
-            color_range_code = Y4M_RANGE_CODES[first_frame_props["_ColorRange"]]
-        chroma_format = _yuv4mpeg2_chroma_string(clip, first_frame_props)
+        if '_ColorRange' in first_props:
+            color_range_code = Y4M_RANGE_CODES[first_props["_ColorRange"]]
+        chroma_format = _yuv4mpeg2_chroma_string(clip, first_props)
     else:
         chroma_format = _yuv4mpeg2_chroma_string(clip)
 
@@ -1,12 +1,17 @@
 from collections.abc import Mapping, Sequence
+from math import ceil
 from typing import Callable, Optional
 
-from vapoursynth import ColorFamily, SampleType, VideoNode, core
+from vapoursynth import ColorFamily, Error, VideoFormat, VideoNode, core
 
 from vsfieldkit.types import (ChromaSubsampleScanning, Factor,
+                              InterlacedScanEngine,
                               InterlacedScanPostProcessor, Resizer)
-from vsfieldkit.util import (assume_progressive, black_clip_from_clip,
-                             brighten, convert_format_if_needed)
+from vsfieldkit.util import (FormatConversionPlan, assume_bff,
+                             assume_progressive, assume_tff,
+                             black_clip_from_clip, brighten, brightening_ops,
+                             convert_format_if_needed, first_field_is_top,
+                             first_frame_props, require_plugins)
 
 post_processing_routines: Mapping[InterlacedScanPostProcessor, Callable]
 
@@ -24,6 +29,8 @@ def scan_interlaced(
     decay_factor: Optional[Factor] = None,
     post_processing: Sequence[InterlacedScanPostProcessor] = (),
     post_processing_blend_kernel: Resizer = core.resize.Spline36,
+    known_props: Optional[Mapping] = None,
+    engine: InterlacedScanEngine = InterlacedScanEngine.FIELD_GRAPH,
 ) -> VideoNode:
     """
     Returns a new clip where interlaced fields from the original clip are
@@ -31,7 +38,10 @@ def scan_interlaced(
     interlaced scan display would. This is sometimes referred to as phosphor
     deinterlacing. Like bob deinterlacing, it doubles the amount of frames
     (and frame rate accordingly) produced to portray the moments represented in
-    the interlaced footage."""
+    the interlaced footage.
+
+    The clip's first frame is rendered once while building the graph to learn
+    its field order and color range, unless known_props supplies them."""
     # TFF (w is warmup frame)
     # Top field source frame: 1 1 2 2 3 3 4 4 5 5
     # Bot field source frame: w 1 1 2 2 3 3 4 4 5
@@ -42,66 +52,127 @@ def scan_interlaced(
     # Bot field source frame: 1 1 2 2 3 3 4 4 5 5
     # Desired Result: wa+1b 1a+1b 2a+1b 2a+2b 3a+2b
 
+    # Even with tff supplied, the first frame's _FieldBased decides the order
+    # SeparateFields emits fields in.
+    clip_props = first_frame_props(clip, known_props)
+
     if not warmup_clip:
-        warmup_clip = black_clip_from_clip(clip, length=1)
+        warmup_clip = black_clip_from_clip(
+            clip,
+            known_props=clip_props,
+            length=1
+        )
         warmup_clip = warmup_clip.std.CopyFrameProps(clip[0])
     else:
         warmup_clip = warmup_clip[-1]
 
-    # Upsample the footage to have single line height chroma resolution if it
-    # doesn't already so that we can persist the exact chroma layout we want to
-    # the final "progressive" frame before downsampling back to 4:2:0 if
-    # requested.
-    scannable_clip = convert_format_if_needed(clip, subsampling_h=0)
-    scannable_warmup = convert_format_if_needed(warmup_clip, subsampling_h=0)
-    chroma_upsampled = (scannable_clip.format.id != clip.format.id)
-
-    phosphor_fields = _scan_clip_to_phosphor_fields(
-        scannable_clip,
-        scannable_warmup,
-        tff=tff
-    )
+    first_field_top = first_field_is_top(clip_props, tff)
     if (
-        chroma_upsampled
-        and chroma_subsample_scanning == ChromaSubsampleScanning.SCAN_LATEST
+        chroma_subsample_scanning
+        == ChromaSubsampleScanning.SCAN_LATEST_SUBSAMPLED
     ):
-        phosphor_fields = _repeat_new_field_chroma(phosphor_fields)
-    if decay_factor:
-        if not decay_base:
-            decay_base = black_clip_from_clip(clip, length=1)
-        scannable_decay_base = convert_format_if_needed(
-            decay_base,
-            format=scannable_clip.format
+        # Fields of vertically subsampled interlaced footage carry their own
+        # chroma rows, so they can be scanned as they are. The new field's
+        # chroma rows are repeated onto the old field's.
+        scannable_clip = clip
+        scannable_warmup = convert_format_if_needed(
+            warmup_clip,
+            format=clip.format
         )
-        # Repeat decay base for every frame of original clip:
-        decay_clip = scannable_decay_base[0] * len(scannable_clip)
-        # Ensure exact same field order instructions as original:
-        decay_clip = decay_clip.std.CopyFrameProps(scannable_clip)
-        decayed_phosphor_fields = _scan_clip_to_phosphor_fields(
-            decay_clip,
-            decay_clip[0],
-            tff=tff
+        repeat_new_field_chroma = (
+            clip.format.color_family == ColorFamily.YUV
+            and clip.format.subsampling_h > 0
         )
+        decay_chroma_planes = not repeat_new_field_chroma
+    else:
+        # Upsample the footage to have single line height chroma resolution
+        # if it doesn't already so that we can persist the exact chroma
+        # layout we want to the final "progressive" frame before downsampling
+        # back to 4:2:0 if requested.
+        scannable_clip = convert_format_if_needed(clip, subsampling_h=0)
+        scannable_warmup = convert_format_if_needed(
+            warmup_clip,
+            subsampling_h=0
+        )
+        chroma_upsampled = (scannable_clip.format.id != clip.format.id)
+        repeat_new_field_chroma = (
+            chroma_upsampled
+            and chroma_subsample_scanning
+            == ChromaSubsampleScanning.SCAN_LATEST
+        )
+        # Chroma planes only decayed if no vertical subsampling, otherwise
+        # our decay bleeds into the newly painted scanlines.
         decay_chroma_planes = (
-            chroma_subsample_scanning == ChromaSubsampleScanning.SCAN_UPSAMPLED
+            chroma_subsample_scanning
+            == ChromaSubsampleScanning.SCAN_UPSAMPLED
             or not chroma_upsampled
         )
-        phosphor_fields = _decay_old_field(
-            phosphor_fields,
-            factor=decay_factor,
-            decay_fields=decayed_phosphor_fields,
-            include_chroma=decay_chroma_planes
+    if decay_factor:
+        if not decay_base:
+            decay_base = black_clip_from_clip(
+                clip,
+                known_props=clip_props,
+                length=1
+            )
+        scannable_decay_base = convert_format_if_needed(
+            decay_base[0],
+            format=scannable_clip.format
         )
-    if attack_factor is not None and attack_factor != 1:
-        phosphor_fields = _brighten_fresh_fields(
-            phosphor_fields,
-            factor=attack_factor
+    else:
+        scannable_decay_base = None
+    if attack_factor == 1:
+        attack_factor = None
+
+    if engine == InterlacedScanEngine.FUSED:
+        as_progressive = _fused_scan(
+            scannable_clip,
+            scannable_warmup,
+            first_field_top=first_field_top,
+            repeat_new_field_chroma=repeat_new_field_chroma,
+            decay_base=scannable_decay_base,
+            decay_factor=decay_factor,
+            decay_chroma_planes=decay_chroma_planes,
+            attack_ops=(
+                brightening_ops(scannable_clip, attack_factor, clip_props)
+                if attack_factor is not None else None
+            )
         )
-
-    laced = core.std.DoubleWeave(phosphor_fields, tff=True)[::2]
-    as_progressive = assume_progressive(laced)
-
-    post_processed = as_progressive
+    else:
+        phosphor_fields = _scan_clip_to_phosphor_fields(
+            scannable_clip,
+            scannable_warmup,
+            tff=tff,
+            first_field_top=first_field_top
+        )
+        if repeat_new_field_chroma:
+            phosphor_fields = _repeat_new_field_chroma(phosphor_fields)
+        if decay_factor:
+            # The decay base is the same for every frame, so its fields only
+            # need separating once and can be repeated in scan order.
+            decayed_phosphor_fields = _constant_phosphor_fields(
+                scannable_decay_base,
+                num_fields=len(phosphor_fields),
+                first_field_top=first_field_top
+            )
+            phosphor_fields = _decay_old_field(
+                phosphor_fields,
+                factor=decay_factor,
+                decay_fields=decayed_phosphor_fields,
+                include_chroma=decay_chroma_planes
+            )
+        if attack_factor is not None:
+            phosphor_fields = _brighten_fresh_fields(
+                phosphor_fields,
+                factor=attack_factor,
+                known_props=clip_props
+            )
+
+        laced = core.std.DoubleWeave(phosphor_fields, tff=True)[::2]
+        as_progressive = assume_progressive(laced)
+
+    # Post-processing and restoring the format are planned together so that
+    # resizes can share passes.
+    post_processed = FormatConversionPlan(as_progressive)
     for step in post_processing:
         process = post_processing_routines[step]
         post_processed = process(post_processed,
@@ -110,34 +181,177 @@ def scan_interlaced(
     if chroma_subsample_scanning == ChromaSubsampleScanning.SCAN_UPSAMPLED:
         # Restore the upsampled format in case changed by post-processing.
         # Restore original bit depth:
-        return convert_format_if_needed(
-            post_processed,
+        restored = post_processed.convert(
             subsampling_w=scannable_clip.format.subsampling_w,
             subsampling_h=scannable_clip.format.subsampling_h,
             bits_per_sample=clip.format.bits_per_sample,
             dither_type=dither_type
         )
     else:
-        return convert_format_if_needed(
-            post_processed,
+        restored = post_processed.convert(
             format=clip.format,
             dither_type=dither_type
         )
+    return restored.apply()
+
+
+def scan_interlaced_chunk(
+    clip: VideoNode,
+    start: int,
+    end: Optional[int] = None,
+    warmup_clip: Optional[VideoNode] = None,
+    tff: Optional[bool] = None,
+    chroma_subsample_scanning: ChromaSubsampleScanning = (
+        ChromaSubsampleScanning.SCAN_LATEST
+    ),
+    dither_type: str = 'random',
+    attack_factor: Optional[Factor] = None,
+    decay_base: Optional[VideoNode] = None,
+    decay_factor: Optional[Factor] = None,
+    post_processing: Sequence[InterlacedScanPostProcessor] = (),
+    post_processing_blend_kernel: Resizer = core.resize.Spline36,
+    known_props: Optional[Mapping] = None,
+    engine: InterlacedScanEngine = InterlacedScanEngine.FIELD_GRAPH,
+) -> VideoNode:
+    """Scans the source frames from start up to end (like a slice) the way
+    scan_interlaced scans them within the whole clip. The source frame before
+    start warms up the chunk's first field, so the outputs of consecutive
+    chunks can be joined to match a scan of the whole clip. warmup_clip is
+    only used by a chunk starting at the clip's first frame.
+
+    Field order and color range are taken from the whole clip's first frame,
+    unless known_props supplies them."""
+    if end is None:
+        end = len(clip)
+    if not 0 <= start < end <= len(clip):
+        raise Error(
+            f'Chunk {start}:{end} is outside of the clip\'s {len(clip)} '
+            f'frames.'
+        )
+
+    # Learned from the whole clip, as a single scan of it would.
+    known_props = first_frame_props(clip, known_props)
+    if start > 0:
+        warmup_clip = clip[start - 1]
+
+    return scan_interlaced(
+        clip[start:end],
+        warmup_clip=warmup_clip,
+        tff=tff,
+        chroma_subsample_scanning=chroma_subsample_scanning,
+        dither_type=dither_type,
+        attack_factor=attack_factor,
+        decay_base=decay_base,
+        decay_factor=decay_factor,
+        post_processing=post_processing,
+        post_processing_blend_kernel=post_processing_blend_kernel,
+        known_props=known_props,
+        engine=engine
+    )
 
 
-def _scan_clip_to_phosphor_fields(clip, warmup_clip, tff):
+def _fused_scan(
+    clip: VideoNode,
+    warmup_clip: VideoNode,
+    first_field_top: bool,
+    repeat_new_field_chroma: bool,
+    decay_base: Optional[VideoNode],
+    decay_factor: Optional[Factor],
+    decay_chroma_planes: bool,
+    attack_ops: Optional[str]
+) -> VideoNode:
+    """Returns scanned frames where each one is computed in a single
+    expression per plane. Lines of the newly scanned field are taken from the
+    current source frame, the other lines from the frame they were last
+    scanned in, picked by line number."""
+    require_plugins(('akarin', 'akarin'))
+
+    # Source frame each frame's old field was last scanned in. The first
+    # frame's comes from the warm-up.
+    synced_warmup = warmup_clip.std.AssumeFPS(src=clip)
+    previous = synced_warmup + clip[:-1] if len(clip) > 1 else synced_warmup
+
+    clips = [clip, previous]
+    if decay_factor and decay_base is not None:
+        clips.append(decay_base * len(clip))
+    # First field from the current frame, second field from the previous one:
+    # 1a+wb, 2a+1b, 3a+2b…
+    first_field_scans = core.akarin.Expr(
+        clips,
+        _fused_scan_exprs(
+            clip.format,
+            fresh_rows_top=first_field_top,
+            old_var='y',
+            repeat_new_field_chroma=repeat_new_field_chroma,
+            decay_factor=decay_factor,
+            decay_chroma_planes=decay_chroma_planes,
+            attack_ops=attack_ops
+        )
+    )
+    # Both fields from the current frame: 1a+1b, 2a+2b, 3a+3b…
+    second_field_scans = core.akarin.Expr(
+        clips,
+        _fused_scan_exprs(
+            clip.format,
+            fresh_rows_top=not first_field_top,
+            old_var='x',
+            repeat_new_field_chroma=repeat_new_field_chroma,
+            decay_factor=decay_factor,
+            decay_chroma_planes=decay_chroma_planes,
+            attack_ops=attack_ops
+        )
+    )
+    scanned = core.std.Interleave(
+        (first_field_scans, second_field_scans),
+        modify_duration=True
+    )
+    return assume_progressive(scanned)
+
+
+def _fused_scan_exprs(
+    format: VideoFormat,
+    fresh_rows_top: bool,
+    old_var: str,
+    repeat_new_field_chroma: bool,
+    decay_factor: Optional[Factor],
+    decay_chroma_planes: bool,
+    attack_ops: Optional[str]
+) -> Sequence[str]:
+    """Per-plane akarin expressions scanning the fresh field from x onto the
+    old field from old_var, decaying the old field towards z."""
+    is_fresh_row = f'Y 2 % {0 if fresh_rows_top else 1} ='
+    exprs = []
+    for plane in range(format.num_planes):
+        is_chroma = plane > 0 and format.color_family == ColorFamily.YUV
+        if is_chroma and repeat_new_field_chroma:
+            # Old rows take the color of the fresh row they're paired with in
+            # the field's chroma.
+            fresh_neighbour = -1 if fresh_rows_top else 1
+            exprs.append(f'{is_fresh_row} x x[0,{fresh_neighbour}] ?')
+            continue
+
+        fresh = 'x'
+        if attack_ops and not is_chroma:
+            fresh = f'x {attack_ops}'
+        old = old_var
+        if decay_factor and (decay_chroma_planes or not is_chroma):
+            factor = float(decay_factor)
+            old = f'{old_var} {1 - factor} * z {factor} * +'
+        exprs.append(f'{is_fresh_row} {fresh} {old} ?')
+    return exprs
+
+
+def _scan_clip_to_phosphor_fields(clip, warmup_clip, tff, first_field_top):
     original_fields = clip.std.SeparateFields(tff=tff)
-    warmup_fields = warmup_clip.std.SeparateFields(tff=tff)
-
-    # Pick out the field position not about to be initialized by main clip
-    first_field = original_fields.get_frame(0).props._Field
-    for field_frame_clip in warmup_fields:
-        field_frame = field_frame_clip.get_frame(0)
-        if field_frame.props._Field != first_field:
-            warmup_field = field_frame_clip
-            break
+
+    # Pick out the field position not about to be initialized by main clip.
+    # Marking the warmup with the main clip's field order means that's always
+    # the second field, without rendering anything to find out.
+    if first_field_top:
+        warmup_fields = assume_tff(warmup_clip).std.SeparateFields()
     else:
-        raise ValueError("Couldn't determine warmup field from supplied clip.")
+        warmup_fields = assume_bff(warmup_clip).std.SeparateFields()
+    warmup_field = warmup_fields[1]
 
     # To achieve the updating and repeating of fields, we can rely on the same
     # functions used to interlace. We just need to ensure every field is
@@ -159,6 +373,29 @@ def _scan_clip_to_phosphor_fields(clip, warmup_clip, tff):
     return phosphor_fields
 
 
+def _constant_phosphor_fields(
+    frame_clip: VideoNode,
+    num_fields: int,
+    first_field_top: bool
+) -> VideoNode:
+    """Returns the scanned field frames _scan_clip_to_phosphor_fields would
+    produce from a clip repeating the given frame, also as its warm-up, by
+    looping the frame's two fields instead of separating every repetition.
+    """
+    if first_field_top:
+        frame_fields = assume_tff(frame_clip).std.SeparateFields()
+    else:
+        frame_fields = assume_bff(frame_clip).std.SeparateFields()
+    first_field = frame_fields[0]
+    second_field = frame_fields[1]
+
+    # The warm-up field is scanned right before the second field of the first
+    # frame, after which the field positions alternate:
+    # First Second(Warmup) Second First Second First Second…
+    alternating = (second_field + first_field) * ceil((num_fields - 2) / 2)
+    return (first_field + second_field + alternating)[:num_fields]
+
+
 def _repeat_new_field_chroma(phosphor_fields: VideoNode, offset=0):
     """Returns a new clip of scanned field frames where the chroma plane from
     the first field of a final frame is copied over the next frame's chroma,
@@ -249,33 +486,16 @@ def _decay_old_field(
         modify_duration=False
     )
 
-    mask_format = core.query_video_format(
-        color_family=ColorFamily.GRAY,
-        sample_type=phosphor_fields.format.sample_type,
-        bits_per_sample=phosphor_fields.format.bits_per_sample
-    )
-    if mask_format.sample_type == SampleType.FLOAT:
-        mask_max = 1.0
-        factor = float(factor)
-    else:
-        mask_max = (2 ** mask_format.bits_per_sample) - 1
-    mask = old_fields.std.BlankClip(
-        length=len(old_fields),
-        format=mask_format,
-        color=round(factor * mask_max)
-    )
-
-    # Chroma planes only decayed if no vertical subsampling, otherwise
-    # our decay bleeds into the newly painted scanlines.
+    num_planes = phosphor_fields.format.num_planes
     if include_chroma:
-        decay_planes = tuple(range(phosphor_fields.format.num_planes))
+        decay_weights = [float(factor)] * num_planes
     else:
-        decay_planes = (0,)
+        decay_weights = [float(factor)] + [0.0] * (num_planes - 1)
 
-    decayed_fields = old_fields.std.MaskedMerge(
+    # A constant weight needs no mask frames to be allocated and read.
+    decayed_fields = old_fields.std.Merge(
         clipb=decayed_old_fields,
-        mask=mask,
-        planes=decay_planes
+        weight=decay_weights
     )
     edited_interleaved = core.std.Interleave(
         (fresh_fields, decayed_fields),
@@ -295,6 +515,7 @@ def _decay_old_field(
 def _brighten_fresh_fields(
     phosphor_fields: VideoNode,
     factor: Factor,
+    known_props: Optional[Mapping] = None,
     offset=0
 ):
     """Returns a new clip of scanned field frames where the newly
@@ -317,7 +538,11 @@ def _brighten_fresh_fields(
         offsets=(0, 3),
         modify_duration=False
     )
-    brightened_fresh_fields = brighten(fresh_fields, factor)
+    brightened_fresh_fields = brighten(
+        fresh_fields,
+        factor,
+        known_props=known_props
+    )
 
     old_fields = edit_range.std.SelectEvery(
         cycle=4,
@@ -340,7 +565,10 @@ def _brighten_fresh_fields(
     return edited_ordered
 
 
-def _blend_vertically(clip: VideoNode, kernel: Resizer) -> VideoNode:
+def _blend_vertically(
+    clip: FormatConversionPlan,
+    kernel: Resizer
+) -> FormatConversionPlan:
     """Instead of typical Bob deinterlacing that takes advantage of temporal
     changes in a field, this deinterlacer simply plays back the interlaced
     fields at their original field rate in their correct position, but blends
@@ -358,16 +586,32 @@ def _blend_vertically(clip: VideoNode, kernel: Resizer) -> VideoNode:
     }
     if clip.format.bits_per_sample < 16:
         processing_format_reqs['bits_per_sample'] = 16
-    downscaled = convert_format_if_needed(
-        clip,
-        height=clip.height // 2,
+    height = clip.height
+    downscaled = clip.convert(
+        height=height // 2,
         kernel=kernel,
         **processing_format_reqs
     )
-    rescaled = kernel(downscaled, height=clip.height)
+    # Left pending so that it can share a pass with the format restoration.
+    rescaled = downscaled.convert(kernel=kernel, height=height)
     return rescaled
 
 
+def _blend_vertically_convolved(
+    clip: FormatConversionPlan,
+    kernel: Resizer
+) -> FormatConversionPlan:
+    """Removes comb lines with a 1, 2, 1 vertical kernel, which entirely
+    cancels lines alternating between two moments. Processed in the clip's
+    own format, so nothing is left for the format restoration to merge with.
+    """
+    blended = clip.apply().std.Convolution(matrix=(1, 2, 1), mode='v')
+    return FormatConversionPlan(blended)
+
+
 post_processing_routines = {
-    InterlacedScanPostProcessor.BLEND_VERTICALLY: _blend_vertically
+    InterlacedScanPostProcessor.BLEND_VERTICALLY: _blend_vertically,
+    InterlacedScanPostProcessor.BLEND_VERTICALLY_CONVOLVED: (
+        _blend_vertically_convolved
+    ),
 }
@@ -0,0 +1,316 @@
+import json
+import os
+from array import array
+from bisect import bisect_right
+from typing import (Any, Dict, Hashable, Iterator, List, Mapping, NamedTuple,
+                    Optional, Sequence, Tuple)
+
+TIMELINE_INDEX_VERSION = 2
+
+
+class FramePropRun(NamedTuple):
+    start: int
+    """First frame of the run."""
+    end: int
+    """Frame after the last frame of the run, like a slice stop."""
+    value: Any
+    """Property value (or tuple of values) shared by every frame in the
+    run."""
+
+
+class FramePropTimeline:
+    """Run-length encoded frame property values of a clip. Runs are stored in
+    compact arrays rather than as clips, so even clips whose property value
+    changes every few frames can be segmented cheaply. Values are looked up
+    by frame number with a binary search.
+    """
+
+    def __init__(
+        self,
+        props: Tuple[str, ...],
+        starts: Sequence[int],
+        ends: Sequence[int],
+        value_ids: Sequence[int],
+        values: Sequence[Hashable],
+        single_prop: bool = False
+    ):
+        self.props = props
+        self.starts = array('q', starts)
+        self.ends = array('q', ends)
+        self.value_ids = array('L', value_ids)
+        self.values = tuple(values)
+        self.single_prop = single_prop
+
+    @property
+    def num_frames(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[FramePropRun]:
+        values = self.values
+        for start, end, value_id in zip(self.starts, self.ends,
+                                        self.value_ids):
+            yield FramePropRun(start, end, values[value_id])
+
+    def __getitem__(self, run_idx: int) -> FramePropRun:
+        return FramePropRun(
+            self.starts[run_idx],
+            self.ends[run_idx],
+            self.values[self.value_ids[run_idx]]
+        )
+
+    def run_index_at(self, n: int) -> int:
+        """Index of the run containing frame number n."""
+        if n < 0:
+            n += self.num_frames
+        if not 0 <= n < self.num_frames:
+            raise IndexError(f'Frame {n} is outside of the timeline.')
+        return bisect_right(self.starts, n) - 1
+
+    def run_at(self, n: int) -> FramePropRun:
+        """The run containing frame number n."""
+        return self[self.run_index_at(n)]
+
+    def value_at(self, n: int) -> Any:
+        """The property value (or tuple of values) at frame number n."""
+        return self.values[self.value_ids[self.run_index_at(n)]]
+
+
+class _TimelineBuilder:
+    """Accumulates per-frame property values into run-length encoded arrays.
+
+    Runs shorter than the minimum length for their value are merged into the
+    preceding run as soon as they end (or into the following run if there is
+    no preceding run), so flickering values never reach the arrays.
+    """
+
+    def __init__(
+        self,
+        props: Tuple[str, ...],
+        single_prop: bool,
+        min_run_length: int = 1,
+        min_run_lengths: Optional[Mapping[Hashable, int]] = None
+    ):
+        self.props = props
+        self.single_prop = single_prop
+        self.min_run_length = min_run_length
+        self.min_run_lengths = min_run_lengths or {}
+        self.starts = array('q')
+        self.ends = array('q')
+        self.value_ids = array('L')
+        self.values: List[Hashable] = []
+        self._value_ids: Dict[Tuple[type, Hashable], int] = {}
+        self._num_frames = 0
+        # Ellipsis marks that no run is open, as None is a valid value.
+        self._run_value: Hashable = ...
+        self._run_start = 0
+
+    def append(self, value: Hashable) -> None:
+        if value != self._run_value:
+            if self._run_value is ...:
+                self._run_start = self._num_frames
+            elif self._run_is_short():
+                if self.starts:
+                    # Absorb the short run into the preceding one.
+                    self._reopen_last_run()
+                else:
+                    # Nothing precedes it, so the next run starts early.
+                    self._run_value = value
+            else:
+                self._close_run()
+                self._run_start = self._num_frames
+
+            if value != self._run_value:
+                if self._run_start != self._num_frames:
+                    # Preceding run was re-opened but holds another value.
+                    self._close_run()
+                    self._run_start = self._num_frames
+                self._run_value = value
+        self._num_frames += 1
+
+    def build(self) -> FramePropTimeline:
+        if self._run_value is not ...:
+            if self._run_is_short() and self.starts:
+                self._reopen_last_run()
+            self._close_run()
+            self._run_value = ...
+
+        values: Sequence[Hashable] = self.values
+        value_ids: Sequence[int] = self.value_ids
+        used_value_ids = sorted(set(self.value_ids))
+        if len(used_value_ids) < len(self.values):
+            # Drop values whose runs were all absorbed by their neighbours.
+            remapped_ids = {
+                old_id: new_id
+                for new_id, old_id in enumerate(used_value_ids)
+            }
+            values = [self.values[value_id] for value_id in used_value_ids]
+            value_ids = [remapped_ids[value_id] for value_id in self.value_ids]
+
+        return FramePropTimeline(
+            props=self.props,
+            starts=self.starts,
+            ends=self.ends,
+            value_ids=value_ids,
+            values=values,
+            single_prop=self.single_prop
+        )
+
+    def _run_is_short(self) -> bool:
+        run_length = self._num_frames - self._run_start
+        min_length = max(
+            self.min_run_length,
+            self.min_run_lengths.get(self._run_value, 1)
+        )
+        return run_length < min_length
+
+    def _reopen_last_run(self) -> None:
+        self.ends.pop()
+        self._run_start = self.starts.pop()
+        self._run_value = self.values[self.value_ids.pop()]
+
+    def _close_run(self) -> None:
+        value = self._run_value
+        # Keyed by type as well so that True and 1 stay distinct values.
+        value_key = (type(value), value)
+        if value_key not in self._value_ids:
+            self._value_ids[value_key] = len(self.values)
+            self.values.append(value)
+        self.starts.append(self._run_start)
+        self.ends.append(self._num_frames)
+        self.value_ids.append(self._value_ids[value_key])
+
+
+def timeline_index_key(
+    source_path: str,
+    props: Sequence[str],
+    num_frames: int,
+    **scan_options: Any
+) -> Mapping[str, Any]:
+    """Identifies a scan of a source file. Changes to the source file's size
+    or modification time produce a different key, invalidating any index
+    written for the old key."""
+    source_stat = os.stat(source_path)
+    return {
+        'version': TIMELINE_INDEX_VERSION,
+        'source': os.path.abspath(source_path),
+        'size': source_stat.st_size,
+        'mtime_ns': source_stat.st_mtime_ns,
+        'props': list(props),
+        'num_frames': num_frames,
+        'options': scan_options,
+    }
+
+
+def read_timeline_index(
+    index_path: str,
+    key: Mapping[str, Any]
+) -> Optional[FramePropTimeline]:
+    """Loads a timeline previously written with write_timeline_index. Returns
+    None if there is no index at the path or if it holds no timeline for the
+    key."""
+    entry = _read_index_entries(index_path).get(_entry_id(key))
+    if entry is None or entry.get('key') != _jsonable(key):
+        return None
+    return FramePropTimeline(
+        props=tuple(entry['props']),
+        starts=entry['starts'],
+        ends=entry['ends'],
+        value_ids=entry['value_ids'],
+        values=[_from_jsonable(value) for value in entry['values']],
+        single_prop=entry['single_prop']
+    )
+
+
+def write_timeline_index(
+    index_path: str,
+    key: Mapping[str, Any],
+    timeline: FramePropTimeline
+) -> None:
+    """Persists the timeline alongside the key it was scanned for. Timelines
+    of other properties or scan options stay in the index as long as they
+    were scanned from the same version of the source file. Raises TypeError
+    if the timeline holds values that can't be stored."""
+    key = _jsonable(key)
+    entries = {
+        entry_id: entry
+        for entry_id, entry in _read_index_entries(index_path).items()
+        if _same_source_file(entry.get('key'), key)
+    }
+    entries[_entry_id(key)] = {
+        'key': key,
+        'props': list(timeline.props),
+        'single_prop': timeline.single_prop,
+        'starts': timeline.starts.tolist(),
+        'ends': timeline.ends.tolist(),
+        'value_ids': timeline.value_ids.tolist(),
+        'values': [_jsonable(value) for value in timeline.values],
+    }
+    index = {
+        'version': TIMELINE_INDEX_VERSION,
+        'entries': list(entries.values()),
+    }
+    serialized = json.dumps(index, separators=(',', ':'))
+    # Write then rename so that an interrupted write never leaves a partial
+    # index behind.
+    temp_path = f'{index_path}.tmp{os.getpid()}'
+    with open(temp_path, 'w', encoding='utf-8') as index_file:
+        index_file.write(serialized)
+    os.replace(temp_path, index_path)
+
+
+def _read_index_entries(index_path: str) -> Dict[str, Dict[str, Any]]:
+    """Timelines stored in the index, by the scan they came from."""
+    try:
+        with open(index_path, 'r', encoding='utf-8') as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+    if (
+        not isinstance(index, dict)
+        or index.get('version') != TIMELINE_INDEX_VERSION
+    ):
+        return {}
+    return {
+        _entry_id(entry['key']): entry
+        for entry in index.get('entries', ())
+        if isinstance(entry, dict) and isinstance(entry.get('key'), dict)
+    }
+
+
+def _entry_id(key: Mapping[str, Any]) -> str:
+    """Identifies the scan a key describes regardless of the state of the
+    source file, so that a rescan replaces the scan's old entry."""
+    return json.dumps(
+        [_jsonable(key.get('props')), _jsonable(key.get('options'))],
+        separators=(',', ':'),
+        sort_keys=True
+    )
+
+
+def _same_source_file(
+    key: Optional[Mapping[str, Any]],
+    other_key: Mapping[str, Any]
+) -> bool:
+    return key is not None and all(
+        key.get(field) == other_key.get(field)
+        for field in ('version', 'source', 'size', 'mtime_ns', 'num_frames')
+    )
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f'Cannot store {value!r} in a timeline index.')
+
+
+def _from_jsonable(value: Any) -> Hashable:
+    if isinstance(value, list):
+        return tuple(_from_jsonable(item) for item in value)
+    return value
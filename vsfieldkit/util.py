@@ -1,9 +1,19 @@
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future
 from functools import partial
-from typing import Iterator, Mapping, Optional, Sequence, Tuple, Union
+from types import MappingProxyType
+from typing import (Any, Callable, Deque, Hashable, Iterator, Mapping,
+                    Optional, Sequence, Tuple, Union)
+from warnings import warn
+from weakref import WeakKeyDictionary
 
 from vapoursynth import (ColorFamily, ColorRange, Error, FieldBased,
                          VideoFormat, VideoFrame, VideoNode, core)
 
+from vsfieldkit.timeline import (FramePropTimeline, _TimelineBuilder,
+                                 read_timeline_index, timeline_index_key,
+                                 write_timeline_index)
 from vsfieldkit.types import Factor, FormatSpecifier, Resizer
 
 FORMAT_INTRINSICS = (
@@ -20,6 +30,11 @@ VERTICAL_CENTER_CHROMA_LOCS = {
     1: 3      # center, resample as top
 }
 
+# Keyed by node so that graph-building helpers share a single render.
+_first_frame_props_cache: 'WeakKeyDictionary[VideoNode, Mapping[str, Any]]' = (
+    WeakKeyDictionary()
+)
+
 
 def assume_bff(clip: VideoNode) -> VideoNode:
     """Returns a new clip where every frame is marked as interlaced in
@@ -87,52 +102,273 @@ def double(clip: VideoNode) -> VideoNode:
 
 
 def group_by_combed(
-    clip: VideoNode
+    clip: VideoNode,
+    prefetch: int = 0,
+    source_path: Optional[str] = None,
+    index_path: Optional[str] = None,
+    min_run_length: int = 1,
+    hysteresis: Optional[Tuple[int, int]] = None
 ) -> Iterator[Tuple[Union[bool, None], VideoNode]]:
     """Assuming the passed-in clip was processed by a filter that performs
     comb detection, this splits the clip into segments based on whether they
     are combed or not. The values it generates are True, False, or None if it
     was marked combed, not combed, or not marked as well as the segment of the
-    clip."""
-    last_combed = ...
-    last_change = 0
-    for n, frame in enumerate(clip.frames()):
-        is_combed = getattr(frame.props, '_Combed', None)
-        if is_combed != last_combed:
-            if last_combed is not ...:
-                yield last_combed, clip[last_change:n]
-                last_change = n
-
-            last_combed = is_combed
-    yield last_combed, clip[last_change:]
+    clip.
+
+    Runs shorter than min_run_length are merged into their neighbours. If
+    hysteresis is given as (enter, leave), a combed run must last at least
+    enter frames and a not-combed run at least leave frames to be kept."""
+    min_run_lengths: Optional[Mapping[Hashable, int]] = None
+    if hysteresis is not None:
+        enter, leave = hysteresis
+        min_run_lengths = {True: enter, False: leave, None: leave}
+    timeline = scan_frame_props(
+        clip,
+        '_Combed',
+        prefetch=prefetch,
+        source_path=source_path,
+        index_path=index_path,
+        min_run_length=min_run_length,
+        min_run_lengths=min_run_lengths
+    )
+    for start, end, is_combed in timeline:
+        yield is_combed, clip[start:end]
 
 
 def group_by_field_order(
-    clip: VideoNode
+    clip: VideoNode,
+    prefetch: int = 0,
+    source_path: Optional[str] = None,
+    index_path: Optional[str] = None
 ) -> Iterator[Tuple[Union[FieldBased, None], VideoNode]]:
     """
     Generates field orders and clips from the passed in clip split up by
     changes in field order. Field order is expressed as a
     vapoursynth.FieldBased enumeration or None if field order is not
     applicable or not available."""
-    last_order = ...
-    last_change = 0
-    for n, frame in enumerate(clip.frames()):
-        frame_order = getattr(frame.props, '_FieldBased', None)
-        if frame_order != last_order:
-            if last_order is not ...:
-                yield (
-                    None if last_order is None else FieldBased(last_order),
-                    clip[last_change:n]
-                )
-                last_change = n
+    timeline = scan_frame_props(
+        clip,
+        '_FieldBased',
+        prefetch=prefetch,
+        source_path=source_path,
+        index_path=index_path
+    )
+    for start, end, field_based in timeline:
+        yield (
+            None if field_based is None else FieldBased(field_based),
+            clip[start:end]
+        )
+
 
-            last_order = frame_order
-    yield (
-          None if last_order is None else FieldBased(last_order),
-          clip[last_change:]
+def scan_frame_props(
+    clip: VideoNode,
+    props: Union[str, Sequence[str]],
+    prefetch: int = 0,
+    source_path: Optional[str] = None,
+    index_path: Optional[str] = None,
+    min_run_length: int = 1,
+    min_run_lengths: Optional[Mapping[Hashable, int]] = None
+) -> FramePropTimeline:
+    """Renders every frame of the clip and records the values of the given
+    frame properties as a run-length encoded timeline. If a single property
+    name is given, the timeline's values are that property's values (or None
+    where absent). If a sequence of names is given, the values are tuples.
+
+    If the path of the file the clip was sourced from is given, the timeline
+    is stored in a sidecar index next to it (or at index_path) and re-used
+    instead of re-scanning until the source file changes. The index keeps a
+    timeline for each combination of properties and scan options, so
+    different scans of the same source can share it.
+
+    Runs shorter than min_run_length frames, or shorter than the length
+    min_run_lengths maps their value to, are merged into the preceding run
+    (or the following run at the start of the clip) as the scan goes."""
+    single_prop = isinstance(props, str)
+    prop_names: Tuple[str, ...] = (
+        (props,) if isinstance(props, str) else tuple(props)
     )
 
+    if source_path is None:
+        return _scan_frame_props(
+            clip,
+            prop_names,
+            single_prop,
+            prefetch,
+            min_run_length=min_run_length,
+            min_run_lengths=min_run_lengths
+        )
+
+    if index_path is None:
+        index_path = f'{source_path}.vsfieldkit-index'
+    index_key = timeline_index_key(
+        source_path,
+        props=prop_names,
+        num_frames=len(clip),
+        single_prop=single_prop,
+        min_run_length=min_run_length,
+        # As pairs, since JSON object keys can only be strings.
+        min_run_lengths=list((min_run_lengths or {}).items())
+    )
+    timeline = read_timeline_index(index_path, index_key)
+    if timeline is None:
+        timeline = _scan_frame_props(
+            clip,
+            prop_names,
+            single_prop,
+            prefetch,
+            min_run_length=min_run_length,
+            min_run_lengths=min_run_lengths
+        )
+        try:
+            write_timeline_index(index_path, index_key, timeline)
+        except (OSError, TypeError) as e:
+            warn(f'Could not write frame property index to {index_path}: '
+                 f'{e}')
+    return timeline
+
+
+def _scan_frame_props(
+    clip: VideoNode,
+    props: Tuple[str, ...],
+    single_prop: bool,
+    prefetch: int,
+    min_run_length: int = 1,
+    min_run_lengths: Optional[Mapping[Hashable, int]] = None
+) -> FramePropTimeline:
+    builder = _TimelineBuilder(
+        props,
+        single_prop=single_prop,
+        min_run_length=min_run_length,
+        min_run_lengths=min_run_lengths
+    )
+    for frame in _prefetched_frames(clip, prefetch):
+        frame_props = frame.props
+        if single_prop:
+            builder.append(_hashable_prop_value(frame_props.get(props[0])))
+        else:
+            builder.append(tuple(
+                _hashable_prop_value(frame_props.get(prop))
+                for prop in props
+            ))
+    return builder.build()
+
+
+def _hashable_prop_value(value: Any) -> Hashable:
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def process_segments(
+    clip: VideoNode,
+    timeline: FramePropTimeline,
+    processors: Mapping[Any, Callable[[VideoNode], VideoNode]],
+    default: Optional[Callable[[VideoNode], VideoNode]] = None
+) -> VideoNode:
+    """Processes each segment of a timeline with the function mapped to the
+    segment's value without splicing segments together. Each distinct
+    function is applied once to the whole clip and every output frame is then
+    routed to the processed clip for its segment, so the graph grows with the
+    number of distinct values rather than the number of segments."""
+    if timeline.num_frames != len(clip):
+        raise Error(
+            f'Timeline covers {timeline.num_frames} frames but the clip has '
+            f'{len(clip)}.'
+        )
+
+    processed_by_processor = {}
+    routes = []
+    for value in timeline.values:
+        processor = processors.get(value, default)
+        if processor not in processed_by_processor:
+            processed_by_processor[processor] = (
+                clip if processor is None else processor(clip)
+            )
+        routes.append(processed_by_processor[processor])
+
+    processed_clips = tuple(processed_by_processor.values())
+    if len(processed_clips) == 1:
+        return processed_clips[0]
+
+    base = processed_clips[0]
+    for processed in processed_clips[1:]:
+        if (
+            len(processed) != len(base)
+            or processed.format.id != base.format.id
+            or processed.width != base.width
+            or processed.height != base.height
+        ):
+            raise Error(
+                'Segment processors must all produce clips of the same '
+                'length, format and dimensions.'
+            )
+
+    # Processors may change the frame count uniformly (e.g. bobbing). Map
+    # output frames back to the source frame they were derived from.
+    source_length = len(clip)
+    processed_length = len(base)
+    starts = timeline.starts
+    run_routes = [routes[value_id] for value_id in timeline.value_ids]
+
+    def route_frame(n: int) -> VideoNode:
+        source_n = n * source_length // processed_length
+        return run_routes[bisect_right(starts, source_n) - 1]
+
+    return base.std.FrameEval(
+        eval=route_frame,
+        **_supported_args(core.std.FrameEval, clip_src=processed_clips)
+    )
+
+
+def _supported_args(func: Callable, **args: Any) -> Mapping[str, Any]:
+    """Filters the arguments down to the ones accepted by the given VapourSynth
+    plugin function in the running version of VapourSynth."""
+    return {
+        arg: value
+        for arg, value in args.items()
+        if _accepts_arg(func, arg)
+    }
+
+
+def _accepts_arg(func: Callable, arg: str) -> bool:
+    """Whether the given VapourSynth plugin function accepts the argument in
+    the running version of VapourSynth."""
+    signature = getattr(func, 'signature', '')
+    return any(
+        param.split(':', 1)[0] == arg
+        for param in signature.split(';')
+    )
+
+
+def _prefetched_frames(
+    clip: VideoNode,
+    prefetch: int = 0,
+    frame_numbers: Optional[Sequence[int]] = None
+) -> Iterator[VideoFrame]:
+    """Generates every frame of the clip (or the given frame numbers) in order
+    while keeping a bounded window of asynchronous frame requests in flight,
+    allowing VapourSynth to render ahead on all of its threads. A prefetch of
+    0 keeps as many requests in flight as the core has threads.
+    """
+    if prefetch < 1:
+        prefetch = core.num_threads
+    if frame_numbers is None:
+        frame_numbers = range(len(clip))
+    if prefetch == 1 or not hasattr(clip, 'get_frame_async'):
+        for n in frame_numbers:
+            yield clip.get_frame(n)
+        return
+
+    requests: Deque[Future] = deque()
+    pending_numbers = iter(frame_numbers)
+    for _n in frame_numbers:
+        while len(requests) < prefetch:
+            next_request = next(pending_numbers, None)
+            if next_request is None:
+                break
+            requests.append(clip.get_frame_async(next_request))
+        yield requests.popleft().result()
+
 
 def convert_format_if_needed(
     clip: VideoNode,
@@ -141,53 +377,173 @@ def convert_format_if_needed(
     dither_type='random',
     **format_or_resize_specs,
 ):
-    existing_fmt_specs = {
-        attr: getattr(clip.format, attr)
-        for attr in FORMAT_INTRINSICS
-    }
+    return FormatConversionPlan(clip).convert(
+        kernel=kernel,
+        format=format,
+        dither_type=dither_type,
+        **format_or_resize_specs
+    ).apply()
+
+
+class FormatConversionPlan:
+    """Format and size changes waiting to be applied to a clip. Consecutive
+    changes using the same kernel are coalesced into a single resize pass as
+    long as at most one of them resizes or otherwise needs resize arguments
+    beyond a format. Passes that can't be merged keep integer intermediates at
+    16 bits so that dithering only happens once, in the final pass.
+
+    Plans are immutable; convert returns a new plan.
+    """
 
-    target_fmt_specs = dict(existing_fmt_specs)
-    if format:
-        target_fmt_specs.update({
-            attr: getattr(format, attr)
+    def __init__(self, clip: VideoNode):
+        self.clip = clip
+        self._kernel: Optional[Resizer] = None
+        self._target_fmt_specs = {
+            attr: getattr(clip.format, attr)
             for attr in FORMAT_INTRINSICS
+        }
+        self._resize_args: Mapping[str, Any] = {}
+        self._dither_type: Optional[str] = None
+
+    @property
+    def format(self) -> VideoFormat:
+        """Format of the clip once the plan is applied."""
+        return core.query_video_format(**self._target_fmt_specs)
+
+    @property
+    def width(self) -> int:
+        return self._resize_args.get('width', self.clip.width)
+
+    @property
+    def height(self) -> int:
+        return self._resize_args.get('height', self.clip.height)
+
+    def convert(
+        self,
+        kernel: Resizer = core.resize.Spline36,
+        format: Optional[VideoFormat] = None,
+        dither_type='random',
+        **format_or_resize_specs
+    ) -> 'FormatConversionPlan':
+        """Plans a conversion of the clip resulting from this plan, taking
+        the same arguments as convert_format_if_needed."""
+        target_fmt_specs = dict(self._target_fmt_specs)
+        if format:
+            target_fmt_specs.update({
+                attr: getattr(format, attr)
+                for attr in FORMAT_INTRINSICS
+            })
+        target_fmt_specs.update({
+            arg: value
+            for arg, value in format_or_resize_specs.items()
+            if arg in FORMAT_INTRINSICS
         })
-    target_fmt_specs.update({
-        arg: value
-        for arg, value in format_or_resize_specs.items()
-        if arg in FORMAT_INTRINSICS
-    })
-
-    resize_args = {
-        arg: value
-        for arg, value in format_or_resize_specs.items()
-        if arg not in FORMAT_INTRINSICS
-    }
-    if target_fmt_specs != existing_fmt_specs:
-        resize_args['format'] = core.query_video_format(**target_fmt_specs).id
-
-    if not resize_args:
-        # No changes needed.
-        return clip
+        resize_args = {
+            arg: value
+            for arg, value in format_or_resize_specs.items()
+            if arg not in FORMAT_INTRINSICS
+        }
 
-    if (
-        dither_type is not None
-        and dither_type != 'none'
-        and target_fmt_specs['bits_per_sample'] < 16
-    ):
-        resize_args['dither_type'] = dither_type
+        if (
+            self._kernel is None
+            or not self._has_changes()
+            or (
+                _same_kernel(kernel, self._kernel)
+                and not (resize_args and self._resize_args)
+            )
+        ):
+            planned = FormatConversionPlan(self.clip)
+            planned._resize_args = {**self._resize_args, **resize_args}
+        else:
+            planned = FormatConversionPlan(self._realize(final=False))
+            planned._resize_args = resize_args
+        planned._kernel = kernel
+        planned._target_fmt_specs = target_fmt_specs
+        planned._dither_type = dither_type
+        return planned
+
+    def apply(self) -> VideoNode:
+        """Renders the plan into as few resize passes as it was able to
+        coalesce."""
+        return self._realize(final=True)
+
+    def _has_changes(self) -> bool:
+        existing_fmt_specs = {
+            attr: getattr(self.clip.format, attr)
+            for attr in FORMAT_INTRINSICS
+        }
+        return (
+            bool(self._resize_args)
+            or self._target_fmt_specs != existing_fmt_specs
+        )
 
-    return kernel(clip, **resize_args)
+    def _realize(self, final: bool) -> VideoNode:
+        if self._kernel is None or not self._has_changes():
+            # No changes needed.
+            return self.clip
+
+        target_fmt_specs = dict(self._target_fmt_specs)
+        if (
+            not final
+            and target_fmt_specs['sample_type'] == 0
+            and target_fmt_specs['bits_per_sample'] < 16
+        ):
+            # Leave rounding to the final pass.
+            target_fmt_specs['bits_per_sample'] = 16
+
+        resize_args = dict(self._resize_args)
+        existing_fmt_specs = {
+            attr: getattr(self.clip.format, attr)
+            for attr in FORMAT_INTRINSICS
+        }
+        if target_fmt_specs != existing_fmt_specs:
+            resize_args['format'] = core.query_video_format(
+                **target_fmt_specs
+            ).id
+
+        if not resize_args:
+            return self.clip
+
+        dither_type = self._dither_type
+        if (
+            dither_type is not None
+            and dither_type != 'none'
+            and target_fmt_specs['bits_per_sample'] < 16
+        ):
+            resize_args['dither_type'] = dither_type
+
+        return self._kernel(self.clip, **resize_args)
+
+
+def _same_kernel(kernel: Resizer, other_kernel: Resizer) -> bool:
+    if kernel is other_kernel:
+        return True
+    # VapourSynth creates a new function object on every attribute lookup.
+    plugin = getattr(kernel, 'plugin', None)
+    other_plugin = getattr(other_kernel, 'plugin', None)
+    return (
+        plugin is not None
+        and other_plugin is not None
+        and plugin.namespace == other_plugin.namespace
+        and getattr(kernel, 'name') == getattr(other_kernel, 'name')
+    )
 
 
-def black_clip_from_clip(clip, **blank_clip_args):
+def black_clip_from_clip(
+    clip: VideoNode,
+    known_props: Optional[Mapping[str, Any]] = None,
+    **blank_clip_args
+) -> VideoNode:
     """Creates a clip of black color in the same format as the passed in clip.
     Unlike BlankClip, this takes the passed in clip's color range into account
-    by rendering the first frame.
+    by inspecting the first frame's properties, unless they're already known.
     """
     bit_depth = clip.format.bits_per_sample
     is_integer = (clip.format.sample_type == 0)
-    color_range = clip.get_frame(0).props.get('_ColorRange')
+    if is_integer:
+        color_range = first_frame_props(clip, known_props).get('_ColorRange')
+    else:
+        color_range = None
 
     black_planes = []
     # Luma Plane
@@ -209,7 +565,11 @@ def black_clip_from_clip(clip, **blank_clip_args):
     return clip.std.BlankClip(color=black_planes, **blank_clip_args)
 
 
-def brighten(clip: VideoNode, factor: Factor):
+def brighten(
+    clip: VideoNode,
+    factor: Factor,
+    known_props: Optional[Mapping[str, Any]] = None
+):
     """Increases intensity across all colors.
     This may not map 1:1 with an H′S′V′ family V′ increase.
     With Y′CbCr, only increases Y′.
@@ -217,11 +577,27 @@ def brighten(clip: VideoNode, factor: Factor):
     Note this increase ignores the clip's OETF (transfer characteristic)
     so the factor is applied as if the values are linear light levels.
     """
+    plane_expr = f'x {brightening_ops(clip, factor, known_props)}'
+    if clip.format.color_family == ColorFamily.YUV:
+        expr = (plane_expr, '')
+    else:
+        expr = (plane_expr,)
+
+    return clip.std.Expr(expr)
+
+
+def brightening_ops(
+    clip: VideoNode,
+    factor: Factor,
+    known_props: Optional[Mapping[str, Any]] = None
+) -> str:
+    """Expr operations that brighten the value on top of the stack the way
+    brighten does, for use within larger expressions."""
     format: VideoFormat = clip.format
     is_integer = (format.sample_type == 0)
-    color_range = clip.get_frame(0).props.get('_ColorRange')
 
     if is_integer:
+        color_range = first_frame_props(clip, known_props).get('_ColorRange')
         if color_range == ColorRange.RANGE_LIMITED:
             ceiling_multiplier = (2 ** format.bits_per_sample) / 256
             max_val = 235 * ceiling_multiplier
@@ -230,13 +606,47 @@ def brighten(clip: VideoNode, factor: Factor):
     else:
         max_val = 1.0
 
-    plane_expr = f'x {float(factor)} * {max_val} min'
-    if format.color_family == ColorFamily.YUV:
-        expr = (plane_expr, '')
-    else:
-        expr = (plane_expr,)
+    return f'{float(factor)} * {max_val} min'
 
-    return clip.std.Expr(expr)
+
+def first_frame_props(
+    clip: VideoNode,
+    known_props: Optional[Mapping[str, Any]] = None
+) -> Mapping[str, Any]:
+    """Read-only properties of the clip's first frame. The frame is rendered
+    at most once per node; later calls for the same node are answered from a
+    cache that doesn't keep the node alive. If known_props is supplied, it's
+    returned as-is and nothing is rendered."""
+    if known_props is not None:
+        return known_props
+    try:
+        return _first_frame_props_cache[clip]
+    except KeyError:
+        pass
+    props = _snapshot_props(clip.get_frame(0))
+    _first_frame_props_cache[clip] = props
+    return props
+
+
+def _snapshot_props(frame: VideoFrame) -> Mapping[str, Any]:
+    return MappingProxyType(dict(frame.props))
+
+
+def first_field_is_top(props: Mapping, tff: Optional[bool]) -> bool:
+    """Whether SeparateFields will emit a top field first, given the clip's
+    first frame properties. Like SeparateFields, an interlaced _FieldBased
+    takes precedence over the tff argument."""
+    field_based = props.get('_FieldBased')
+    if field_based == FieldBased.FIELD_TOP:
+        return True
+    if field_based == FieldBased.FIELD_BOTTOM:
+        return False
+    if tff is None:
+        raise Error(
+            'Field order could not be determined from the first frame. '
+            'Supply tff.'
+        )
+    return tff
 
 
 def format_from_specifier(specifier: FormatSpecifier) -> VideoFormat:
@@ -277,7 +687,9 @@ def shift_chroma_to_luma_sited(
     clip: VideoNode,
     tff: bool,
     kernel: Resizer,
-    dither_type: Optional[str] = 'random'
+    dither_type: Optional[str] = 'random',
+    props_from_first_frame: bool = False,
+    known_props: Optional[Mapping[str, Any]] = None
 ) -> VideoNode:
     """Takes a clip marked as having vertically centered chroma and
     assumes that the chroma samples are centered BETWEEN luma samples
@@ -285,19 +697,35 @@ def shift_chroma_to_luma_sited(
     resemble the same content but relative from the luma sample
     locations. The _ChromaLocation property will be corrected to
     one that makes more sense (e.g. topleft instead of left).
+
+    By default each field's _ChromaLocation and _Field are inspected by a
+    Python callback. If props_from_first_frame is True, every frame is
+    assumed to share the first frame's _ChromaLocation and the tff field
+    order, so fields are shifted by position with native filters instead.
+    The first frame's properties can be given as known_props to avoid
+    rendering it.
     """
     if clip.format.color_family != ColorFamily.YUV:
         return clip
 
+    if props_from_first_frame:
+        chroma_loc = first_frame_props(clip, known_props).get(
+            '_ChromaLocation'
+        )
+        if chroma_loc not in VERTICAL_CENTER_CHROMA_LOCS:
+            # Assume was already vertically co-sited
+            return clip
+
     def shift_centered_chroma(
         n: int,
         f: VideoFrame,
         plane_fields: VideoNode,
-        field_shifts: Mapping[Optional[int], VideoNode]
+        field_shifts: Mapping[Optional[int], Mapping[Optional[int], VideoNode]]
     ):
         props = f.props
-        if props.get('_ChromaLocation') in VERTICAL_CENTER_CHROMA_LOCS:
-            return field_shifts[props.get('_Field')]
+        chroma_loc = props.get('_ChromaLocation')
+        if chroma_loc in VERTICAL_CENTER_CHROMA_LOCS:
+            return field_shifts[chroma_loc][props.get('_Field')]
         else:
             # Assume was already vertically co-sited
             return plane_fields
@@ -305,6 +733,10 @@ def shift_chroma_to_luma_sited(
     y, cb, cr = clip.std.SplitPlanes()
     shifted_planes = [y]
     for plane in cb, cr:
+        if props_from_first_frame:
+            # Only the chroma is separated in the given order, so the output
+            # keeps the clip's own field order.
+            plane = assume_tff(plane) if tff else assume_bff(plane)
         plane_fields = plane.std.SeparateFields(tff=tff)
         shifted_as_top = kernel(
             plane_fields,
@@ -316,11 +748,54 @@ def shift_chroma_to_luma_sited(
             src_top=1 / 4,
             dither_type=dither_type
         )
-        field_shifts = {
-            None: shifted_as_top if tff else shifted_as_bottom,
-            0: shifted_as_bottom,
-            1: shifted_as_top
-        }
+        if props_from_first_frame:
+            # Parity simply alternates, so fields can be picked from each
+            # shifted clip without looking at them.
+            if tff:
+                first, second = shifted_as_top, shifted_as_bottom
+            else:
+                first, second = shifted_as_bottom, shifted_as_top
+            shifted_plane_fields = core.std.Interleave(
+                (
+                    first.std.SelectEvery(
+                        cycle=2,
+                        offsets=0,
+                        modify_duration=False
+                    ),
+                    second.std.SelectEvery(
+                        cycle=2,
+                        offsets=1,
+                        modify_duration=False
+                    )
+                ),
+                modify_duration=False
+            )
+            shifted_planes.append(
+                shifted_plane_fields.std.DoubleWeave()[::2]
+            )
+            continue
+
+        # The corrected _ChromaLocation is stamped on the shifted fields so
+        # that it can be copied natively to the final frames.
+        field_shifts = {}
+        for chroma_loc, luma_sited_loc in VERTICAL_CENTER_CHROMA_LOCS.items():
+            if chroma_loc is None:
+                sited_as_top = shifted_as_top
+                sited_as_bottom = shifted_as_bottom
+            else:
+                sited_as_top = shifted_as_top.std.SetFrameProp(
+                    prop='_ChromaLocation',
+                    intval=luma_sited_loc
+                )
+                sited_as_bottom = shifted_as_bottom.std.SetFrameProp(
+                    prop='_ChromaLocation',
+                    intval=luma_sited_loc
+                )
+            field_shifts[chroma_loc] = {
+                None: sited_as_top if tff else sited_as_bottom,
+                0: sited_as_bottom,
+                1: sited_as_top
+            }
 
         shifted_plane_fields = plane_fields.std.FrameEval(
             eval=partial(
@@ -329,7 +804,14 @@ def shift_chroma_to_luma_sited(
                 field_shifts=field_shifts
             ),
             prop_src=(plane_fields,),
-            clip_src=(plane_fields, shifted_as_top, shifted_as_bottom)
+            clip_src=(
+                plane_fields,
+                *(
+                    shift
+                    for loc_shifts in field_shifts.values()
+                    for shift in loc_shifts.values()
+                )
+            )
         )
         shifted_planes.append(
             shifted_plane_fields.std.DoubleWeave()[::2]
@@ -340,6 +822,20 @@ def shift_chroma_to_luma_sited(
         colorfamily=ColorFamily.YUV
     )
 
+    if props_from_first_frame:
+        if chroma_loc is None:
+            return shifted
+        return shifted.std.SetFrameProp(
+            prop='_ChromaLocation',
+            intval=VERTICAL_CENTER_CHROMA_LOCS[chroma_loc]
+        )
+
+    if _accepts_arg(core.std.CopyFrameProps, 'props'):
+        return shifted.std.CopyFrameProps(
+            shifted_planes[1],
+            props=('_ChromaLocation',)
+        )
+
     def revise_frame_props(n: int, f: VideoFrame):
         props = f.props
         corrected_f = f.copy()
@@ -365,12 +861,56 @@ def annotate_bobbed_fields(
     clip: VideoNode,
     original_clip: VideoNode,
     prop: str = 'OriginalField',
-    tff: Optional[bool] = None
+    tff: Optional[bool] = None,
+    field_order_from_props: bool = True
 ) -> VideoNode:
     """Adds a property to frames of a bobbed clip to indicate what
-    original field position was used to derive the new frame."""
+    original field position was used to derive the new frame.
+
+    If field_order_from_props is False, every original frame is assumed to be
+    in the tff field order, avoiding per-frame property inspection."""
     assert len(clip) == len(original_clip) * 2
 
+    if not field_order_from_props:
+        if tff is None:
+            raise Error('tff must be supplied when field order is not read '
+                        'from frame properties.')
+        first_fields = clip.std.SelectEvery(
+            cycle=2,
+            offsets=0,
+            modify_duration=False
+        ).std.SetFrameProp(prop=prop, intval=int(tff))
+        second_fields = clip.std.SelectEvery(
+            cycle=2,
+            offsets=1,
+            modify_duration=False
+        ).std.SetFrameProp(prop=prop, intval=int(not tff))
+        return core.std.Interleave(
+            (first_fields, second_fields),
+            modify_duration=False
+        )
+
+    if prop == '_Field' and _accepts_arg(core.std.CopyFrameProps, 'props'):
+        # SeparateFields resolves field order from the same props, so its
+        # _Field can be copied over. Fields of a tiny stand-in clip carrying
+        # the original props avoid copying any picture data.
+        stand_in = original_clip.std.BlankClip(
+            width=1,
+            height=2,
+            format=core.query_video_format(
+                color_family=ColorFamily.GRAY,
+                sample_type=0,
+                bits_per_sample=8,
+                subsampling_w=0,
+                subsampling_h=0
+            ).id,
+            keep=True
+        ).std.CopyFrameProps(original_clip)
+        return clip.std.CopyFrameProps(
+            stand_in.std.SeparateFields(tff=tff),
+            props=(prop,)
+        )
+
     def annotate_frame(n: int, f: Sequence[VideoFrame]):
         bobbed_frame, original_frame = f
         field_based = original_frame.props.get('_FieldBased')
@@ -404,6 +944,9 @@ def copy_specific_frame_props(
     if not props:
         return clip
 
+    if _accepts_arg(core.std.CopyFrameProps, 'props'):
+        return clip.std.CopyFrameProps(prop_src, props=props)
+
     def copy(n: int, f: Sequence[VideoFrame]):
         original_frame, prop_src_frame = f
         new_frame = original_frame.copy()